@@ -0,0 +1,66 @@
+# Memory per million entries and measured false-positive rate of the
+# duplicate-vote filter at a few error rates, plus the cost of one lookup.
+# Also fills a filter to several times its starting capacity to show the
+# scalable chain holding its error budget.
+#
+#   python benchmarks/bloom_bench.py --entries 1000000
+import argparse
+import sys
+import time
+
+from common import BACKEND_DIR
+
+sys.path.insert(0, BACKEND_DIR)
+
+from vote_filter import ScalableBloomFilter  # noqa: E402
+
+
+def pair(i):
+    return f'{i % 50 + 1}:+2547{i:08d}'
+
+
+def measure(capacity, error_rate, entries, probes):
+    bloom = ScalableBloomFilter(capacity, error_rate)
+
+    started = time.perf_counter()
+    for i in range(entries):
+        bloom.add(pair(i))
+    add_us = (time.perf_counter() - started) / entries * 1e6
+
+    # Pairs that were never added: every hit is a false positive.
+    started = time.perf_counter()
+    false_positives = sum(pair(i) in bloom for i in range(entries, entries + probes))
+    lookup_us = (time.perf_counter() - started) / probes * 1e6
+
+    return {
+        'links': len(bloom.filters),
+        'mb_per_million': bloom.nbytes / entries * 1_000_000 / 2 ** 20,
+        'fp_rate': false_positives / probes,
+        'add_us': add_us,
+        'lookup_us': lookup_us,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--entries', type=int, default=1_000_000)
+    parser.add_argument('--probes', type=int, default=200_000)
+    parser.add_argument('--error-rates', default='0.01,0.001,0.0001')
+    args = parser.parse_args()
+
+    print(f'{"capacity":>10} {"entries":>10} {"target":>8} {"links":>5} {"MB/1M":>7} {"fp rate":>9} {"add us":>7} {"get us":>7}')
+    runs = [(args.entries, float(rate)) for rate in args.error_rates.split(',')]
+    # Grown past its starting size.
+    runs.append((args.entries // 4, 0.001))
+
+    for capacity, error_rate in runs:
+        result = measure(capacity, error_rate, args.entries, args.probes)
+        print(
+            f'{capacity:>10} {args.entries:>10} {error_rate:>8} {result["links"]:>5} '
+            f'{result["mb_per_million"]:>7.2f} {result["fp_rate"]:>9.5f} '
+            f'{result["add_us"]:>7.2f} {result["lookup_us"]:>7.2f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
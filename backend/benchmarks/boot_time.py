@@ -0,0 +1,55 @@
+# Measures what a fresh worker pays before it can serve: importing app.py,
+# and the first request after that (connection, leaderboard load, lazily
+# built clients). Each run is a new interpreter; medians are reported.
+#
+#   python benchmarks/boot_time.py --runs 10
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from common import BACKEND_DIR, load_backend, seed_candidates
+
+
+PROBE = '''
+import json, sys, time
+started = time.perf_counter()
+import app as backend
+imported = time.perf_counter()
+client = backend.app.test_client()
+status = client.get(sys.argv[1]).status_code
+finished = time.perf_counter()
+print(json.dumps({'import': imported - started, 'first_request': finished - imported, 'status': status}))
+'''
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--database-url', default='sqlite:////tmp/voting_boot.db')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--path', default='/results/Benchmark%20Category?top=10')
+    args = parser.parse_args()
+
+    backend = load_backend(args.database_url)
+    seed_candidates(backend, 50)
+
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='')
+    samples = []
+    for _ in range(args.runs):
+        output = subprocess.run(
+            [sys.executable, '-c', PROBE, args.path],
+            cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+
+    statuses = {sample['status'] for sample in samples}
+    print(f'runs: {args.runs}, status: {sorted(statuses)}')
+    for key in ('import', 'first_request'):
+        values = [sample[key] * 1000 for sample in samples]
+        print(f'{key:<14} median {statistics.median(values):8.1f} ms   min {min(values):8.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+import os
+import sys
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_backend(database_url, **env):
+    # app.py reads its configuration at import time, so the environment has to
+    # be in place before the first import. One database per process.
+    os.environ['DATABASE_URL'] = database_url
+    os.environ.setdefault('JWT_SECRET_KEY', 'benchmark-secret-key-of-sufficient-length')
+    os.environ.setdefault('TWILIO_ACCOUNT_SID', 'ACbenchmark')
+    os.environ.setdefault('TWILIO_AUTH_TOKEN', 'benchmark')
+    # All load comes from one address, so the per-IP limits are lifted rather
+    # than switched off; every request still pays for taking its tokens.
+    os.environ.setdefault('RATE_LIMIT_STORE_PATH', f'/tmp/voting_bench_ratelimit_{os.getpid()}.sqlite3')
+    os.environ.setdefault('RATE_LIMIT_VOTE_PER_IP', '1000000000/1')
+    os.environ.setdefault('RATE_LIMIT_OTP_PER_IP', '1000000000/1')
+    os.environ.setdefault('RATE_LIMIT_OTP_ROUTE', '1000000000/1')
+    for key, value in env.items():
+        os.environ[key] = str(value)
+
+    os.chdir(BACKEND_DIR)
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+
+    import app as backend
+
+    with backend.app.app_context():
+        backend.db.drop_all()
+        backend.db.create_all()
+
+    return backend
+
+
+def seed_candidates(backend, count, category='Benchmark Category'):
+    with backend.app.app_context():
+        start = backend.Candidate.query.count()
+        candidates = [
+            backend.Candidate(full_name=f'Candidate {i}', email=f'candidate{i}@example.com', password='x')
+            for i in range(start, start + count)
+        ]
+        backend.db.session.add_all(candidates)
+        backend.db.session.flush()
+
+        backend.db.session.add_all([
+            backend.Verification(
+                candidate_id=candidate.id,
+                phone_number=f'+2547{candidate.id:08d}',
+                national_id=f'ID{candidate.id:08d}',
+                is_verified=True,
+                category=category
+            )
+            for candidate in candidates
+        ])
+        backend.db.session.commit()
+
+        return [candidate.id for candidate in candidates]
+
+
+def reset_votes(backend):
+    with backend.app.app_context():
+        backend.Votes.query.delete()
+        backend.VoteTally.query.delete()
+        backend.TallyProgress.query.delete()
+        backend.db.session.commit()
+    # Otherwise every pair of the next run is a filter false positive.
+    backend.vote_filter.reset()
@@ -0,0 +1,87 @@
+# Time a request thread spends per log call: print() of the payload plus
+# basicConfig's synchronous StreamHandler (the old setup) against
+# BackgroundHandler with JSON formatting on the listener thread.
+# --sink-delay-us makes every write stall, like stderr piped to a log
+# collector that is falling behind.
+#
+#   python benchmarks/logging_bench.py --calls 20000 --sink-delay-us 200
+import argparse
+import logging
+import os
+import sys
+import time
+
+from common import BACKEND_DIR
+
+sys.path.insert(0, BACKEND_DIR)
+
+from logs import BackgroundHandler, JsonFormatter  # noqa: E402
+
+
+class SlowStream:
+    def __init__(self, stream, delay):
+        self.stream = stream
+        self.delay = delay
+
+    def write(self, data):
+        if self.delay:
+            time.sleep(self.delay)
+        return self.stream.write(data)
+
+    def flush(self):
+        self.stream.flush()
+
+
+PAYLOAD = {'email': 'candidate1@example.com', 'password': 'hunter2', 'full_name': 'Candidate 1'}
+
+
+def time_calls(log, calls):
+    started = time.perf_counter()
+    for i in range(calls):
+        log(i)
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--calls', type=int, default=20000)
+    parser.add_argument('--output', default='/tmp/voting_logging_bench.log')
+    parser.add_argument('--sink-delay-us', type=float, default=0)
+    args = parser.parse_args()
+
+    with open(args.output, 'w') as f:
+        out = SlowStream(f, args.sink_delay_us / 1e6)
+        target = logging.StreamHandler(out)
+        logger = logging.getLogger('bench')
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+
+        def old(i):
+            print('Received login data:', PAYLOAD, file=out)
+            logger.info('Login for candidate %s', i)
+
+        target.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+        logger.handlers = [target]
+        old_us = time_calls(old, args.calls)
+
+        def new(i):
+            logger.info('Login for candidate %s', i, extra={'fields': {'payload': PAYLOAD}})
+
+        json_target = logging.StreamHandler(out)
+        json_target.setFormatter(JsonFormatter())
+        background = BackgroundHandler(json_target)
+        logger.handlers = [background]
+        new_us = time_calls(new, args.calls)
+        background.close()
+
+        logger.setLevel(logging.WARNING)
+        skipped_us = time_calls(new, args.calls)
+
+    print(f'print + sync handler:   {old_us:6.1f} us per call')
+    print(f'background JSON:        {new_us:6.1f} us per call')
+    print(f'filtered by level:      {skipped_us:6.1f} us per call')
+    print(f'{os.path.getsize(args.output)} bytes written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+# Logins/sec through POST /login for several password-hash pool sizes.
+#
+#   python benchmarks/login_bench.py --workers 1,2,4 --logins 400
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import generate_password_hash
+
+from common import load_backend
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--database-url', default='sqlite:////tmp/voting_login_bench.db')
+    parser.add_argument('--logins', type=int, default=400)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--workers', default='1,2,4')
+    args = parser.parse_args()
+
+    backend = load_backend(args.database_url)
+
+    # Every user shares one hash up front so seeding doesn't dominate the run.
+    pwhash = generate_password_hash('benchmark-password', backend.PASSWORD_HASH_METHOD)
+    with backend.app.app_context():
+        backend.db.session.add_all([
+            backend.Candidate(full_name=f'User {i}', email=f'user{i}@example.com', password=pwhash)
+            for i in range(args.users)
+        ])
+        backend.db.session.commit()
+
+    def login(i):
+        response = backend.app.test_client().post('/login', json={
+            'email': f'user{i % args.users}@example.com',
+            'password': 'benchmark-password'
+        })
+        return response.status_code
+
+    print(f'{"workers":>7} {"ok":>6} {"busy":>6} {"logins/sec":>11}')
+    for workers in (int(n) for n in args.workers.split(',')):
+        backend.password_hasher.shutdown()
+        backend.password_hasher = backend.PasswordHasher(
+            method=backend.PASSWORD_HASH_METHOD,
+            workers=workers,
+            max_pending=args.threads
+        )
+        login(0)  # start the pool outside the timed run
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as pool:
+            statuses = list(pool.map(login, range(args.logins)))
+        elapsed = time.perf_counter() - started
+
+        ok = statuses.count(200)
+        print(f'{workers:>7} {ok:>6} {statuses.count(503):>6} {ok / elapsed:>11.1f}')
+
+    backend.password_hasher.shutdown()
+
+
+if __name__ == '__main__':
+    main()
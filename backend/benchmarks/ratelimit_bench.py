@@ -0,0 +1,70 @@
+# Cost of one rate-limit decision against the shared SQLite bucket store
+# (one bucket, and the three /vote takes: phone, IP, route), and a check that
+# buckets really are shared: several processes hammering one key must let
+# exactly `capacity` requests through between them.
+#
+#   python benchmarks/ratelimit_bench.py --decisions 20000 --processes 4
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+from common import BACKEND_DIR
+
+sys.path.insert(0, BACKEND_DIR)
+
+from ratelimit import SqliteBucketStore  # noqa: E402
+
+
+def time_decisions(store, decisions, buckets_per_request, keys):
+    started = time.perf_counter()
+    for i in range(decisions):
+        key = i % keys
+        store.take([(f'bench:{scope}:{key}', 1000000, 1000000.0) for scope in range(buckets_per_request)])
+    return (time.perf_counter() - started) / decisions * 1e6
+
+
+def hammer(path, attempts, results):
+    store = SqliteBucketStore(path)
+    allowed = sum(store.take([('shared:phone:254700000001', 50, 50 / 3600)]) is None for _ in range(attempts))
+    results.put(allowed)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--path', default='/tmp/voting_ratelimit_bench.sqlite3')
+    parser.add_argument('--decisions', type=int, default=20000)
+    parser.add_argument('--keys', type=int, default=10000)
+    parser.add_argument('--processes', type=int, default=4)
+    args = parser.parse_args()
+
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(args.path + suffix):
+            os.remove(args.path + suffix)
+
+    store = SqliteBucketStore(args.path)
+    for buckets in (1, 3):
+        us = time_decisions(store, args.decisions, buckets, args.keys)
+        print(f'{buckets} bucket(s) per request: {us:6.1f} us per decision')
+
+    results = multiprocessing.Queue()
+    workers = [
+        multiprocessing.Process(target=hammer, args=(args.path, 200, results)) for _ in range(args.processes)
+    ]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    allowed = sum(results.get() for _ in workers)
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    print(
+        f'{args.processes} processes x 200 attempts on one 50-token bucket: '
+        f'{allowed} allowed ({"ok" if allowed == 50 else "MISMATCH"}), '
+        f'{args.processes * 200 / elapsed:.0f} decisions/s under contention'
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+import csv
+import io
+import itertools
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlalchemy import text
+from werkzeug.security import generate_password_hash
+
+
+# Columns understood by load_candidates(). `password` values are hashed (slow
+# for large files); `password_hash` is stored as-is; rows with neither get an
+# unusable password and have to go through forgot_password before logging in.
+IMPORT_COLUMNS = (
+    'full_name', 'email', 'password_hash', 'phone_number', 'national_id',
+    'profile_image', 'is_verified', 'category'
+)
+UNUSABLE_PASSWORD = '!'
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 't'}
+
+
+def read_rows(path):
+    # Dicts from a CSV file with a header row, or from JSON lines.
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.endswith(('.jsonl', '.ndjson')):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(f)
+
+
+def chunked(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def normalize(rows, password_method):
+    with ProcessPoolExecutor() as pool:
+        for chunk in chunked(rows, 1000):
+            chunk = [row for row in chunk if row.get('email') and row.get('full_name')]
+            plain = [row.get('password') if not row.get('password_hash') else None for row in chunk]
+            to_hash = [password for password in plain if password]
+            hashed = iter(pool.map(generate_password_hash, to_hash, itertools.repeat(password_method), chunksize=32))
+
+            for row, password in zip(chunk, plain):
+                yield {
+                    'full_name': row['full_name'].strip(),
+                    'email': row['email'].strip().lower(),
+                    'password_hash': next(hashed) if password else (row.get('password_hash') or UNUSABLE_PASSWORD),
+                    'phone_number': row.get('phone_number') or None,
+                    'national_id': row.get('national_id') or None,
+                    'profile_image': row.get('profile_image') or None,
+                    'is_verified': str(row.get('is_verified', '')).strip().lower() in TRUE_VALUES,
+                    'category': row.get('category') or 'Uncategorized'
+                }
+
+
+def load_candidates(db, Candidate, Verification, rows, password_method, chunk_size=5000):
+    # Returns (candidates inserted, verifications inserted). Rows for an email
+    # that already exists, or that appeared earlier in the file, are skipped;
+    # so are verifications reusing a phone number or national ID. Each chunk
+    # is staged in a temp table (COPY on Postgres) and moved across with the
+    # same INSERT ... SELECT ... ON CONFLICT DO NOTHING on every database.
+    rows = normalize(rows, password_method)
+    postgres = db.session.get_bind().dialect.name == 'postgresql'
+
+    candidates = verifications = 0
+    seq = itertools.count()
+    for chunk in chunked(rows, chunk_size):
+        connection = db.session.connection()
+        connection.execute(text(
+            'CREATE TEMP TABLE IF NOT EXISTS candidate_import ('
+            'seq integer, full_name text, email text, password_hash text, phone_number text, national_id text, '
+            'profile_image text, is_verified boolean, category text)'
+        ))
+        connection.execute(text('DELETE FROM candidate_import'))
+        staged = [dict(row, seq=next(seq)) for row in chunk]
+        if postgres:
+            _copy_staged(connection, staged)
+        else:
+            connection.execute(text(
+                f"INSERT INTO candidate_import (seq, {', '.join(IMPORT_COLUMNS)}) "
+                f"VALUES (:seq, {', '.join(':' + column for column in IMPORT_COLUMNS)})"
+            ), staged)
+
+        # Keep each new email's first row only.
+        connection.execute(text(
+            'DELETE FROM candidate_import WHERE email IN (SELECT email FROM candidate) '
+            'OR seq > (SELECT MIN(seq) FROM candidate_import earlier WHERE earlier.email = candidate_import.email)'
+        ))
+        candidates += connection.execute(text(
+            'INSERT INTO candidate (full_name, email, password) '
+            'SELECT full_name, email, password_hash FROM candidate_import WHERE true ORDER BY seq '
+            'ON CONFLICT (email) DO NOTHING'
+        )).rowcount
+        verifications += connection.execute(text(
+            'INSERT INTO verification (candidate_id, phone_number, national_id, profile_image, is_verified, category) '
+            'SELECT c.id, i.phone_number, i.national_id, i.profile_image, i.is_verified, i.category '
+            'FROM candidate_import i JOIN candidate c ON c.email = i.email '
+            'WHERE i.phone_number IS NOT NULL AND i.national_id IS NOT NULL '
+            'AND NOT EXISTS (SELECT 1 FROM verification v WHERE v.candidate_id = c.id) '
+            'ORDER BY i.seq '
+            'ON CONFLICT DO NOTHING'
+        )).rowcount
+        db.session.commit()
+
+    return candidates, verifications
+
+
+def _copy_staged(connection, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    columns = ('seq',) + IMPORT_COLUMNS
+    for row in rows:
+        writer.writerow([row[column] if row[column] is not None else '' for column in columns])
+    buffer.seek(0)
+
+    cursor = connection.connection.cursor()
+    cursor.copy_expert(f"COPY candidate_import ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '')", buffer)
+
+
+def export_query(db, query, out, header):
+    # Streams a query's rows to `out` as CSV. On Postgres the server writes
+    # the CSV itself via COPY ... TO STDOUT.
+    if db.session.get_bind().dialect.name == 'postgresql':
+        sql = str(query.compile(db.session.get_bind(), compile_kwargs={'literal_binds': True}))
+        cursor = db.session.connection().connection.cursor()
+        cursor.copy_expert(f'COPY ({sql}) TO STDOUT WITH (FORMAT csv, HEADER)', out)
+        return
+
+    writer = csv.writer(out)
+    writer.writerow(header)
+    for row in db.session.execute(query.execution_options(yield_per=5000)):
+        writer.writerow(row)
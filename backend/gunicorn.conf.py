@@ -0,0 +1,59 @@
+import os
+import shutil
+
+
+# Per-worker metric files for /metrics; wiped when the master starts so
+# counters from a previous run don't leak into this one.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/voting_metrics')
+# preload_app imports the metrics before on_starting runs, and they need
+# somewhere to write (the master itself never records anything).
+os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
+
+def on_starting(server):
+    metrics_dir = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+
+workers = int(os.getenv('WEB_CONCURRENCY', 4))
+threads = int(os.getenv('GUNICORN_THREADS', 32))
+
+# Each open /results/stream holds one of a worker's threads until it ends;
+# keep RESULTS_STREAM_RESERVED_THREADS of them for voting and the rest of the
+# API, and let the others stream. app.py reads this when preload_app imports it.
+os.environ.setdefault('RESULTS_STREAM_MAX_CLIENTS', str(max(1, threads - int(os.getenv('RESULTS_STREAM_RESERVED_THREADS', 8)))))
+
+
+# Import app.py once in the master and fork workers from it, instead of every
+# worker importing it on its own.
+preload_app = True
+
+
+def post_fork(server, worker):
+    # Nothing should have connected in the master, but a pooled connection
+    # inherited across fork would be shared with it; drop any without closing.
+    from app import app, db
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+
+def when_ready(server):
+    # Runs in the master before any worker is forked: fill the duplicate-vote
+    # filter once so every worker starts with it instead of scanning the
+    # votes table on its first vote.
+    from app import app, db, vote_filter
+    try:
+        with app.app_context():
+            vote_filter.ensure_loaded()
+            # The master has no further use for the connection.
+            for engine in db.engines.values():
+                engine.dispose()
+    except Exception:
+        server.log.exception('Warming the vote filter failed; workers will load it on first use')
@@ -0,0 +1,85 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+logger = logging.getLogger(__name__)
+
+
+class HashingBusy(Exception):
+    pass
+
+
+class PasswordHasher:
+    # Runs the password KDF in a small process pool so a burst of logins can't
+    # hold request threads (and the GIL) hostage. At most `max_pending` hashes
+    # per worker are admitted; a request that can't get a slot within
+    # `admission_timeout` seconds gets HashingBusy instead of queueing forever.
+    #
+    # `method` is a werkzeug method string with its cost parameters, e.g.
+    # 'scrypt:32768:8:1' or 'pbkdf2:sha256:600000'. Hashes made with anything
+    # else are reported by needs_rehash() so login can upgrade them.
+    #
+    # The pool starts on first use. Its processes re-import __main__, so a
+    # script without a main guard breaks it; so can a killed process. Either
+    # way this worker then hashes in process rather than failing every login.
+
+    def __init__(self, method='scrypt:32768:8:1', workers=2, max_pending=8, admission_timeout=2, timeout=10):
+        self.method = method
+        self.workers = workers
+        self.timeout = timeout
+        self.admission_timeout = admission_timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self._broken = False
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def check(self, pwhash, password):
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        return pwhash.split('$', 1)[0] != self.method
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(timeout=self.admission_timeout):
+            raise HashingBusy('Too many password operations in progress')
+        try:
+            if not self._broken:
+                try:
+                    return self._get_executor().submit(fn, *args).result(timeout=self.timeout)
+                except BrokenProcessPool:
+                    logger.exception('Password hashing pool broke; hashing in process from now on')
+                    self._broken = True
+                    self.shutdown()
+            return fn(*args)
+        finally:
+            self._slots.release()
+
+    def _get_executor(self):
+        pid = os.getpid()
+        if self._executor is None or self._pid != pid:
+            with self._lock:
+                if self._executor is None or self._pid != pid:
+                    # forkserver: forking a worker that already runs threads
+                    # (vote flusher, mail queue) is not safe. The server itself
+                    # only needs the hashing, not the default __main__.
+                    context = multiprocessing.get_context('forkserver')
+                    context.set_forkserver_preload(['werkzeug.security'])
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+                    self._pid = pid
+        return self._executor
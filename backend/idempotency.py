@@ -0,0 +1,134 @@
+import functools
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from flask import Response, current_app, jsonify, request
+
+
+# Responses that say "try again" must not be replayed to the retry.
+RETRYABLE_STATUSES = {409, 429}
+
+
+class IdempotencyStore:
+    # Remembers the response sent for each idempotency key for `ttl` seconds,
+    # in a small SQLite file on local disk so every gunicorn worker on the
+    # host sees the same keys without a round trip to the main database.
+    # The first request for a key claims it; a concurrent duplicate sees the
+    # claim and backs off until the first one completes or its lease runs
+    # out (a worker died mid-request). At most `max_entries` keys are kept.
+
+    def __init__(self, path, ttl=86400, max_entries=100000, lease_seconds=30, prune_every=500):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lease_seconds = lease_seconds
+        self.prune_every = prune_every
+        self._local = threading.local()
+        self._claims = 0
+
+    def claim(self, key, fingerprint):
+        # Returns None when the caller now owns the key, otherwise the stored
+        # row as (fingerprint, status, mimetype, body); status is None while
+        # the owner is still working on it.
+        now = time.time()
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            row = connection.execute(
+                'SELECT fingerprint, status, mimetype, body FROM idempotency_keys WHERE key = ? AND expires_at > ?',
+                (key, now)
+            ).fetchone()
+            if row is not None:
+                return row
+            connection.execute(
+                'INSERT OR REPLACE INTO idempotency_keys (key, fingerprint, status, mimetype, body, created_at, expires_at) '
+                'VALUES (?, ?, NULL, NULL, NULL, ?, ?)',
+                (key, fingerprint, now, now + self.lease_seconds)
+            )
+
+        self._claims += 1
+        if self._claims % self.prune_every == 0:
+            self.prune()
+        return None
+
+    def complete(self, key, status, mimetype, body):
+        with self._connection() as connection:
+            connection.execute(
+                'UPDATE idempotency_keys SET status = ?, mimetype = ?, body = ?, expires_at = ? WHERE key = ?',
+                (status, mimetype, body, time.time() + self.ttl, key)
+            )
+
+    def release(self, key):
+        with self._connection() as connection:
+            connection.execute('DELETE FROM idempotency_keys WHERE key = ?', (key,))
+
+    def prune(self):
+        with self._connection() as connection:
+            connection.execute('DELETE FROM idempotency_keys WHERE expires_at <= ?', (time.time(),))
+            connection.execute(
+                'DELETE FROM idempotency_keys WHERE key IN ('
+                'SELECT key FROM idempotency_keys ORDER BY created_at DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,)
+            )
+
+    def _connection(self):
+        # One connection per thread, and new ones after a fork.
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS idempotency_keys ('
+                'key TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, status INTEGER, mimetype TEXT, body BLOB, '
+                'created_at REAL NOT NULL, expires_at REAL NOT NULL)'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS ix_idempotency_keys_created_at ON idempotency_keys (created_at)')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+
+def idempotent(store, key_func, match_body=True):
+    # Replays the stored response when key_func() returns a key that has been
+    # seen before, without running the view (or touching the database).
+    # With match_body, reusing a key for a different request body is a 422.
+    # Requests without a key run as normal.
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            key = key_func()
+            if not key:
+                return view(*args, **kwargs)
+
+            key = f'{request.endpoint}:{key}'
+            fingerprint = hashlib.sha256(request.get_data()).hexdigest() if match_body else ''
+            stored = store.claim(key, fingerprint)
+
+            if stored is not None:
+                stored_fingerprint, status, mimetype, body = stored
+                if stored_fingerprint != fingerprint:
+                    return jsonify({'error': 'Idempotency key was already used for a different request'}), 422
+                if status is None:
+                    return jsonify({'error': 'A request with this idempotency key is in progress'}), 409, {'Retry-After': '1'}
+                response = Response(body, status=status, mimetype=mimetype)
+                response.headers['Idempotent-Replayed'] = 'true'
+                return response
+
+            try:
+                response = current_app.make_response(view(*args, **kwargs))
+            except BaseException:
+                store.release(key)
+                raise
+
+            if response.status_code >= 500 or response.status_code in RETRYABLE_STATUSES:
+                store.release(key)
+            else:
+                store.complete(key, response.status_code, response.mimetype, response.get_data())
+            return response
+
+        return wrapper
+    return decorator
@@ -0,0 +1,90 @@
+import hashlib
+import io
+import os
+import re
+import tempfile
+
+
+# Fixed-size variants made from every upload, each as WebP plus a JPEG
+# fallback: '<digest>_<variant>.<format>' next to the original '<digest>.<ext>'.
+VARIANT_SIZES = {'thumb': 160, 'card': 480}
+VARIANT_FORMATS = {'webp': 'WEBP', 'jpg': 'JPEG'}
+
+ORIGINAL_EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif'}
+
+# Refuse decompression bombs long before they reach memory.
+MAX_IMAGE_PIXELS = 40_000_000
+
+HASHED_NAME = re.compile(r'^([0-9a-f]{32})\.(?:jpg|png|gif)$')
+CONTENT_HASHED_FILE = re.compile(r'^[0-9a-f]{32}(?:_(?:%s))?\.(?:jpg|png|gif|webp)$' % '|'.join(VARIANT_SIZES))
+
+
+class InvalidImage(Exception):
+    pass
+
+
+def store_image(data, folder):
+    # Stores an upload under its content hash and renders its variants,
+    # decoding it once. Identical uploads map to the same files, so a
+    # re-upload is just a hash. Returns the original's filename. Pillow is
+    # imported here so that booting a worker doesn't pay for it.
+    from PIL import Image, ImageOps
+    Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+
+    digest = hashlib.sha256(data).hexdigest()[:32]
+
+    try:
+        image = Image.open(io.BytesIO(data))
+        extension = ORIGINAL_EXTENSIONS.get(image.format)
+        if extension is None:
+            raise InvalidImage(f'Unsupported image format: {image.format}')
+
+        filename = f'{digest}.{extension}'
+        if os.path.exists(os.path.join(folder, filename)):
+            return filename
+
+        image = ImageOps.exif_transpose(image).convert('RGB')
+    except (OSError, Image.DecompressionBombError) as e:
+        raise InvalidImage(str(e))
+
+    for variant, size in VARIANT_SIZES.items():
+        resized = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+        for suffix, image_format in VARIANT_FORMATS.items():
+            buffer = io.BytesIO()
+            resized.save(buffer, image_format, quality=80)
+            _write(folder, f'{digest}_{variant}.{suffix}', buffer.getvalue())
+
+    # The original goes last: its presence marks the set as complete.
+    _write(folder, filename, data)
+    return filename
+
+
+def variant_names(filename):
+    # {'thumb': {'webp': ..., 'jpg': ...}, ...} for a content-hashed original,
+    # or None for images uploaded before variants existed.
+    match = HASHED_NAME.match(os.path.basename(filename or ''))
+    if not match:
+        return None
+
+    digest = match.group(1)
+    return {
+        variant: {extension: f'{digest}_{variant}.{extension}' for extension in VARIANT_FORMATS}
+        for variant in VARIANT_SIZES
+    }
+
+
+def is_content_hashed(filename):
+    # Originals and variants named by content never change once written.
+    return bool(CONTENT_HASHED_FILE.match(os.path.basename(filename)))
+
+
+def _write(folder, filename, data):
+    fd, temp_path = tempfile.mkstemp(dir=folder, prefix='.upload-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, os.path.join(folder, filename))
+    except BaseException:
+        os.unlink(temp_path)
+        raise
@@ -0,0 +1,82 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class VoteBatcher:
+    # Votes are validated on the request thread and handed over here; a single
+    # flusher thread per worker commits them in micro-batches so many votes
+    # share one transaction (and one fsync). Callers block on the returned
+    # future until the batch holding their vote has been committed.
+
+    def __init__(self, flush, max_batch=64, max_wait_ms=5, app=None):
+        self.app = app
+        self.flush = flush
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def init_app(self, app):
+        # The flusher commits in this app's context.
+        self.app = app
+
+    def submit(self, vote):
+        self._ensure_started()
+        future = Future()
+        self._queue.put((vote, future))
+        return future
+
+    def _ensure_started(self):
+        pid = os.getpid()
+        if self._pid == pid and self._thread is not None and self._thread.is_alive():
+            return
+
+        with self._lock:
+            if self._pid != pid:
+                # Threads don't survive a fork, so a gunicorn worker starts
+                # its own flusher with a fresh queue.
+                self._queue = queue.Queue()
+                self._thread = None
+                self._pid = pid
+
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='vote-flusher', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            self._flush(batch)
+
+    def _flush(self, batch):
+        votes = [vote for vote, _ in batch]
+
+        try:
+            with self.app.app_context():
+                results = self.flush(votes)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
@@ -0,0 +1,106 @@
+import heapq
+import threading
+import time
+
+
+class Leaderboard:
+    # Per-category vote standings kept in worker memory. Built from the
+    # database on first use, bumped as this worker commits votes, and rebuilt
+    # every `refresh_seconds` (or sooner for callers passing `max_age`) to
+    # pick up votes committed by other workers.
+    # `on_change(category, candidate_id, vote_count)` hears about every count
+    # that moves, whichever way it was learned.
+
+    def __init__(self, load, refresh_seconds=30, on_change=None):
+        self.load = load
+        self.refresh_seconds = refresh_seconds
+        self.on_change = on_change
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self._counts = {}
+        self._names = {}
+        self._loaded_at = None
+
+    def ensure_loaded(self, max_age=None):
+        if not self._is_stale(max_age):
+            return
+
+        # Only one thread rebuilds; the others keep serving the current view.
+        if self._rebuild_lock.acquire(blocking=self._loaded_at is None):
+            try:
+                if self._is_stale(max_age):
+                    self.rebuild()
+            finally:
+                self._rebuild_lock.release()
+
+    def _is_stale(self, max_age=None):
+        if self._loaded_at is None:
+            return True
+        max_age = self.refresh_seconds if max_age is None else max_age
+        return bool(max_age) and time.monotonic() - self._loaded_at > max_age
+
+    def rebuild(self):
+        counts = {}
+        names = {}
+        for category, candidate_id, full_name, vote_count in self.load():
+            counts.setdefault(category, {})[candidate_id] = vote_count
+            names[candidate_id] = full_name
+
+        with self._lock:
+            previous = self._counts
+            self._counts = counts
+            self._names = names
+            self._loaded_at = time.monotonic()
+
+        if self.on_change:
+            for category, standings in counts.items():
+                old = previous.get(category, {})
+                for candidate_id, vote_count in standings.items():
+                    if old.get(candidate_id) != vote_count:
+                        self.on_change(category, candidate_id, vote_count)
+
+    def knows(self, candidate_id):
+        return candidate_id in self._names
+
+    def record(self, category, candidate_id, full_name=None, amount=1):
+        with self._lock:
+            if self._loaded_at is None:
+                # Not built yet; the first rebuild reads this vote from the database.
+                return
+
+            standings = self._counts.setdefault(category, {})
+            standings[candidate_id] = vote_count = standings.get(candidate_id, 0) + amount
+            if full_name is not None:
+                self._names[candidate_id] = full_name
+
+        if self.on_change:
+            self.on_change(category, candidate_id, vote_count)
+
+    def top(self, category, k=None):
+        # [(candidate_id, full_name, vote_count)] best first, or None for an
+        # unknown category. Ties go to the lower candidate id.
+        with self._lock:
+            standings = self._counts.get(category)
+            if standings is None:
+                return None
+            items = list(standings.items())
+            names = self._names
+
+        key = lambda item: (-item[1], item[0])
+        if k is None or k >= len(items):
+            ranked = sorted(items, key=key)
+        else:
+            ranked = heapq.nsmallest(k, items, key=key)
+
+        return [(candidate_id, names.get(candidate_id), count) for candidate_id, count in ranked]
+
+    def snapshot(self, category=None):
+        # {category: {candidate_id: vote_count}}, optionally for one category.
+        with self._lock:
+            if category is not None:
+                return {category: dict(self._counts.get(category, {}))}
+            return {name: dict(standings) for name, standings in self._counts.items()}
+
+    def total(self, category):
+        with self._lock:
+            return sum(self._counts.get(category, {}).values())
@@ -0,0 +1,165 @@
+import datetime
+import json
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+from logging.handlers import QueueListener
+
+from flask import g, request
+
+
+request_logger = logging.getLogger('voting.requests')
+
+# Values under these keys never reach the log; identifiers keep their last
+# three characters so support can still match a complaint to a line.
+SECRET_FIELDS = {'password', 'new_password', 'otp', 'token', 'access_token', 'forgot_password', 'authorization'}
+MASKED_FIELDS = {'email', 'phone_number', 'voter_phone', 'national_id', 'from'}
+REDACTED = '[redacted]'
+
+# JWTs and phone numbers that end up inside a message or traceback rather
+# than a field. Phone numbers are masked like MASKED_FIELDS.
+JWT_PATTERN = re.compile(r'eyJ[\w-]+\.[\w-]+\.[\w-]+')
+PHONE_PATTERN = re.compile(r'(?<![\w+])\+?\d{6,12}(\d{3})(?!\w)')
+
+
+def redact(value):
+    if isinstance(value, dict):
+        cleaned = {}
+        for key, item in value.items():
+            name = str(key).lower()
+            if name in SECRET_FIELDS:
+                cleaned[key] = REDACTED
+            elif name in MASKED_FIELDS and item:
+                cleaned[key] = '***' + str(item)[-3:]
+            else:
+                cleaned[key] = redact(item)
+        return cleaned
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+    return value
+
+
+def redact_text(text):
+    return PHONE_PATTERN.sub(r'***\1', JWT_PATTERN.sub(REDACTED, text))
+
+
+class JsonFormatter(logging.Formatter):
+    # One JSON object per line. Structured data goes in `extra={'fields': {...}}`
+    # and is redacted here, on the listener thread.
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': redact_text(record.getMessage()),
+        }
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry.update(redact(fields))
+        if record.exc_text:
+            entry['exc'] = redact_text(record.exc_text)
+        return json.dumps(entry, default=str)
+
+
+class BackgroundHandler(logging.Handler):
+    # The request thread only appends the record to a queue; a listener
+    # thread per worker formats it and writes it to `target`. Like the vote
+    # flusher, the listener is started lazily and again after a fork.
+
+    def __init__(self, target):
+        super().__init__()
+        self.target = target
+        self._queue = queue.SimpleQueue()
+        self._listener = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def emit(self, record):
+        try:
+            if record.exc_info:
+                # Tracebacks have to be rendered while their frames exist.
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+                record.exc_info = None
+            self._ensure_started()
+            self._queue.put_nowait(record)
+        except Exception:
+            self.handleError(record)
+
+    def close(self):
+        # Drains what's queued; logging.shutdown() calls this at exit.
+        with self._lock:
+            if self._listener is not None and self._pid == os.getpid():
+                self._listener.stop()
+            self._listener = None
+        super().close()
+
+    def _ensure_started(self):
+        pid = os.getpid()
+        if self._pid == pid and self._listener is not None:
+            return
+
+        with self._lock:
+            if self._pid != pid or self._listener is None:
+                self._queue = queue.SimpleQueue()
+                self._listener = QueueListener(self._queue, self.target, respect_handler_level=True)
+                self._listener.start()
+                self._pid = pid
+
+
+def parse_sample_rates(value):
+    # 'route=rate,route=rate' with Flask route templates, e.g.
+    # '/vote=0.01,/get_vote_count/<int:candidate_id>=0.05'
+    rates = {}
+    for item in value.split(','):
+        if '=' in item:
+            route, rate = item.rsplit('=', 1)
+            rates[route.strip()] = float(rate)
+    return rates
+
+
+def init_logging(app, level='INFO', sample_rates=None, default_rate=1.0, slow_ms=1000):
+    # Replaces the root handlers with a BackgroundHandler writing JSON lines
+    # to stderr, and logs one line per request. Requests on routes listed in
+    # `sample_rates` are logged at that rate; 5xx responses and anything
+    # slower than `slow_ms` always are. Each line records the rate it was
+    # sampled at so counts can be scaled back up.
+    sample_rates = sample_rates or {}
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    if not any(isinstance(handler, BackgroundHandler) for handler in root.handlers):
+        target = logging.StreamHandler(sys.stderr)
+        target.setFormatter(JsonFormatter())
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        root.addHandler(BackgroundHandler(target))
+
+    @app.before_request
+    def start_request_log():
+        g.log_started = time.perf_counter()
+
+    @app.after_request
+    def log_request(response):
+        started = g.pop('log_started', None)
+        if started is None:
+            return response
+
+        duration_ms = (time.perf_counter() - started) * 1000
+        route = request.url_rule.rule if request.url_rule else '<unmatched>'
+        rate = sample_rates.get(route, default_rate)
+
+        if response.status_code >= 500 or duration_ms >= slow_ms or random.random() < rate:
+            request_logger.info('request', extra={'fields': {
+                'method': request.method,
+                'route': route,
+                'status': response.status_code,
+                'duration_ms': round(duration_ms, 1),
+                'sample_rate': rate,
+            }})
+        return response
@@ -0,0 +1,147 @@
+import datetime
+import logging
+import os
+import threading
+
+from flask_mail import Message
+from sqlalchemy import or_, select, update
+
+
+logger = logging.getLogger(__name__)
+
+
+class MailQueue:
+    # Outbound mail is written to a table in the caller's transaction and
+    # delivered by a background thread in each worker, a batch at a time over
+    # one SMTP connection. Rows are claimed with a compare-and-set lease so
+    # workers don't send the same message twice; failures are retried with
+    # exponential backoff until `max_attempts`, then marked failed.
+
+    def __init__(self, db, model, mail, batch_size=20, poll_seconds=5,
+                 max_attempts=5, backoff_seconds=30, lease_seconds=120, app=None):
+        self.app = app
+        self.db = db
+        self.Mail = model
+        self.mail = mail
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.lease_seconds = lease_seconds
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def init_app(self, app):
+        self.app = app
+        # Make sure every worker drains mail queued before it started.
+        app.before_request(self.ensure_started)
+
+    def enqueue(self, recipient, subject, body):
+        # Added to the current session; the caller's commit makes it durable.
+        self.db.session.add(self.Mail(recipient=recipient, subject=subject, body=body))
+
+    def wake(self):
+        self.ensure_started()
+        self._wake.set()
+
+    def ensure_started(self):
+        pid = os.getpid()
+        if self._pid == pid and self._thread is not None and self._thread.is_alive():
+            return
+
+        with self._lock:
+            if self._pid != pid or self._thread is None or not self._thread.is_alive():
+                self._pid = pid
+                self._wake = threading.Event()
+                self._thread = threading.Thread(target=self._run, name='mail-queue', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                with self.app.app_context():
+                    delivered = self.deliver_due()
+            except Exception:
+                logger.exception('Mail queue run failed')
+                delivered = 0
+
+            # A full batch means there may be more waiting.
+            if delivered < self.batch_size:
+                self._wake.wait(self.poll_seconds)
+                self._wake.clear()
+
+    def deliver_due(self):
+        Mail = self.Mail
+        session = self.db.session
+        now = datetime.datetime.utcnow()
+
+        due = session.execute(
+            select(Mail.id, Mail.recipient, Mail.subject, Mail.body, Mail.attempts, Mail.next_attempt_at)
+            .where(or_(Mail.status == 'queued', Mail.status == 'sending'), Mail.next_attempt_at <= now)
+            .order_by(Mail.id)
+            .limit(self.batch_size)
+        ).all()
+
+        lease = now + datetime.timedelta(seconds=self.lease_seconds)
+        claimed = []
+        for row in due:
+            # 'sending' rows are only due again once a crashed worker's lease ran out.
+            result = session.execute(
+                update(Mail)
+                .where(Mail.id == row.id, Mail.next_attempt_at == row.next_attempt_at)
+                .values(status='sending', next_attempt_at=lease)
+            )
+            if result.rowcount:
+                claimed.append(row)
+        session.commit()
+
+        if not claimed:
+            return 0
+
+        pending = list(claimed)
+        try:
+            with self.mail.connect() as connection:
+                while pending:
+                    row = pending[0]
+                    try:
+                        connection.send(Message(row.subject, recipients=[row.recipient], body=row.body))
+                        self._mark_sent(row)
+                    except Exception as e:
+                        self._mark_retry(row, e)
+                    pending.pop(0)
+                    session.commit()
+        except Exception as e:
+            # Couldn't connect, or the connection dropped mid-batch.
+            for row in pending:
+                self._mark_retry(row, e)
+            session.commit()
+
+        return len(claimed)
+
+    def _mark_sent(self, row):
+        self.db.session.execute(
+            update(self.Mail)
+            .where(self.Mail.id == row.id)
+            .values(status='sent', attempts=row.attempts + 1, sent_at=datetime.datetime.utcnow(), last_error=None)
+        )
+
+    def _mark_retry(self, row, error):
+        logger.warning('Sending mail %s to %s failed: %s', row.id, row.recipient, error)
+        attempts = row.attempts + 1
+
+        if attempts >= self.max_attempts:
+            values = {'status': 'failed'}
+        else:
+            delay = self.backoff_seconds * 2 ** (attempts - 1)
+            values = {
+                'status': 'queued',
+                'next_attempt_at': datetime.datetime.utcnow() + datetime.timedelta(seconds=delay)
+            }
+
+        self.db.session.execute(
+            update(self.Mail)
+            .where(self.Mail.id == row.id)
+            .values(attempts=attempts, last_error=str(error), **values)
+        )
@@ -0,0 +1,113 @@
+import os
+import time
+
+from flask import Response, g, has_request_context, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+# With PROMETHEUS_MULTIPROC_DIR set (see gunicorn.conf.py) every worker writes
+# its samples to that directory and /metrics aggregates all of them.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+REQUESTS = Counter(
+    'voting_http_requests_total', 'HTTP requests handled', ['route', 'method', 'status']
+)
+REQUEST_LATENCY = Histogram(
+    'voting_http_request_duration_seconds', 'HTTP request latency', ['route', 'method'], buckets=LATENCY_BUCKETS
+)
+IN_FLIGHT = Gauge(
+    'voting_http_requests_in_flight', 'HTTP requests being handled', multiprocess_mode='livesum'
+)
+SQL_STATEMENTS = Counter(
+    'voting_sql_statements_total', 'SQL statements executed', ['route']
+)
+SQL_SECONDS = Counter(
+    'voting_sql_seconds_total', 'Time spent executing SQL statements', ['route']
+)
+VOTES = Counter(
+    'voting_votes_total', 'Votes committed', ['channel', 'mode']
+)
+DUPLICATE_CHECKS = Counter(
+    'voting_duplicate_checks_total', 'Duplicate-vote pre-checks by outcome', ['outcome']
+)
+VOTE_BATCHES = Histogram(
+    'voting_vote_batch_size', 'Votes per group commit', buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256)
+)
+RESULT_STREAMS_REFUSED = Counter(
+    'voting_result_streams_refused_total', 'Live results streams turned away at the per-worker cap'
+)
+
+# SQL run outside a request (the vote flusher, CLI commands) is labelled with this.
+BACKGROUND_ROUTE = '<background>'
+
+
+def current_route():
+    if not has_request_context():
+        return BACKGROUND_ROUTE
+    return request.url_rule.rule if request.url_rule else '<unmatched>'
+
+
+def start_statement_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_started', []).append(time.perf_counter())
+
+
+def record_statement(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['metrics_started'].pop()
+    route = current_route()
+    SQL_STATEMENTS.labels(route).inc()
+    SQL_SECONDS.labels(route).inc(time.perf_counter() - started)
+
+
+def discard_statement_timer(context):
+    started = context.connection.info.get('metrics_started') if context.connection is not None else None
+    if started:
+        started.pop()
+
+
+ENGINE_LISTENERS = (
+    ('before_cursor_execute', start_statement_timer),
+    ('after_cursor_execute', record_statement),
+    ('handle_error', discard_statement_timer),
+)
+
+
+def init_metrics(app):
+    @app.before_request
+    def start_request_metrics():
+        g.metrics_started = time.perf_counter()
+        IN_FLIGHT.inc()
+
+    @app.after_request
+    def record_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def finish_request_metrics(exc):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return
+
+        IN_FLIGHT.dec()
+        route = current_route()
+        REQUESTS.labels(route, request.method, g.get('metrics_status', 500)).inc()
+        REQUEST_LATENCY.labels(route, request.method).observe(time.perf_counter() - started)
+
+    # Listeners go on the Engine class, so a second app must not add them again.
+    for identifier, listener in ENGINE_LISTENERS:
+        if not event.contains(Engine, identifier, listener):
+            event.listen(Engine, identifier, listener)
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        registry = REGISTRY
+        if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+
+        return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
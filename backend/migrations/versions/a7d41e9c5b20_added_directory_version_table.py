@@ -0,0 +1,29 @@
+"""Added directory_version table
+
+Revision ID: a7d41e9c5b20
+Revises: f2c6d83b9e14
+Create Date: 2026-10-18 21:14:06.385207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7d41e9c5b20'
+down_revision = 'f2c6d83b9e14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    directory_version = op.create_table('directory_version',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('generation', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.bulk_insert(directory_version, [{'id': 1, 'generation': 0}])
+
+
+def downgrade():
+    op.drop_table('directory_version')
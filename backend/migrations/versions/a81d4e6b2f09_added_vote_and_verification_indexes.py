@@ -0,0 +1,41 @@
+"""Added vote and verification indexes
+
+Revision ID: a81d4e6b2f09
+Revises: cdc0f4abaf86
+Create Date: 2026-10-18 10:03:27.184462
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a81d4e6b2f09'
+down_revision = 'cdc0f4abaf86'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # receive_sms never checked for repeat votes, so drop them (keeping the
+    # first) before the unique constraint goes on.
+    op.execute(
+        'DELETE FROM votes WHERE id NOT IN '
+        '(SELECT MIN(id) FROM votes GROUP BY voter_phone, candidate_id)'
+    )
+
+    with op.batch_alter_table('votes', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_votes_voter_phone_candidate_id', ['voter_phone', 'candidate_id'])
+
+    with op.batch_alter_table('verification', schema=None) as batch_op:
+        batch_op.create_index('ix_verification_candidate_id_category', ['candidate_id', 'category'], unique=False)
+        batch_op.create_index('ix_verification_category', ['category'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('verification', schema=None) as batch_op:
+        batch_op.drop_index('ix_verification_category')
+        batch_op.drop_index('ix_verification_candidate_id_category')
+
+    with op.batch_alter_table('votes', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_votes_voter_phone_candidate_id', type_='unique')
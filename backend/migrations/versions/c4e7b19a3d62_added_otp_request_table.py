@@ -0,0 +1,31 @@
+"""Added otp_request table
+
+Revision ID: c4e7b19a3d62
+Revises: a81d4e6b2f09
+Create Date: 2026-10-18 13:26:51.907245
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e7b19a3d62'
+down_revision = 'a81d4e6b2f09'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('otp_request',
+    sa.Column('id', sa.String(length=32), nullable=False),
+    sa.Column('phone_number', sa.String(length=20), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('otp_request')
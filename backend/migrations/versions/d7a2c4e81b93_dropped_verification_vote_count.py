@@ -0,0 +1,28 @@
+"""Dropped verification.vote_count
+
+Revision ID: d7a2c4e81b93
+Revises: a7d41e9c5b20
+Create Date: 2026-10-19 09:41:12.208734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7a2c4e81b93'
+down_revision = 'a7d41e9c5b20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Vote counts come from vote_tally, which is rebuilt from the votes table;
+    # nothing has read this column since.
+    with op.batch_alter_table('verification', schema=None) as batch_op:
+        batch_op.drop_column('vote_count')
+
+
+def downgrade():
+    with op.batch_alter_table('verification', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('vote_count', sa.Integer(), nullable=True))
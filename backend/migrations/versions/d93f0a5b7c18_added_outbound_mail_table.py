@@ -0,0 +1,41 @@
+"""Added outbound_mail table
+
+Revision ID: d93f0a5b7c18
+Revises: c4e7b19a3d62
+Create Date: 2026-10-18 14:08:13.442907
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd93f0a5b7c18'
+down_revision = 'c4e7b19a3d62'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('outbound_mail',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('recipient', sa.String(length=120), nullable=False),
+    sa.Column('subject', sa.String(length=255), nullable=False),
+    sa.Column('body', sa.Text(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('outbound_mail', schema=None) as batch_op:
+        batch_op.create_index('ix_outbound_mail_status_next_attempt_at', ['status', 'next_attempt_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('outbound_mail', schema=None) as batch_op:
+        batch_op.drop_index('ix_outbound_mail_status_next_attempt_at')
+
+    op.drop_table('outbound_mail')
@@ -0,0 +1,60 @@
+"""Added vote_tally and tally_progress tables, votes.category
+
+Revision ID: e5b8c2a41f07
+Revises: d93f0a5b7c18
+Create Date: 2026-10-18 16:41:27.093514
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b8c2a41f07'
+down_revision = 'd93f0a5b7c18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('votes', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('category', sa.String(length=200), nullable=True))
+
+    # Existing votes take their candidate's category (the first one, if the
+    # candidate stood in several); the reconciler counts them from there.
+    op.execute(
+        "UPDATE votes SET category = COALESCE("
+        "(SELECT MIN(verification.category) FROM verification WHERE verification.candidate_id = votes.candidate_id), "
+        "'Uncategorized')"
+    )
+
+    with op.batch_alter_table('votes', schema=None) as batch_op:
+        batch_op.alter_column('category', existing_type=sa.String(length=200), nullable=False)
+        batch_op.create_index('ix_votes_candidate_id_category', ['candidate_id', 'category'], unique=False)
+
+    op.create_table('vote_tally',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('candidate_id', sa.Integer(), nullable=False),
+    sa.Column('category', sa.String(length=200), nullable=False),
+    sa.Column('vote_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['candidate_id'], ['candidate.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('candidate_id', 'category', name='uq_vote_tally_candidate_id_category')
+    )
+    op.create_table('tally_progress',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('last_vote_id', sa.Integer(), nullable=False),
+    sa.Column('pending_vote_ids', sa.Text(), nullable=False),
+    sa.Column('reconciled_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('tally_progress')
+    op.drop_table('vote_tally')
+
+    with op.batch_alter_table('votes', schema=None) as batch_op:
+        batch_op.drop_index('ix_votes_candidate_id_category')
+        batch_op.drop_column('category')
@@ -0,0 +1,122 @@
+"""Added election, channel and created_at to votes; partition votes by election on Postgres
+
+Revision ID: f2c6d83b9e14
+Revises: e5b8c2a41f07
+Create Date: 2026-10-18 19:02:51.628140
+
+"""
+import os
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c6d83b9e14'
+down_revision = 'e5b8c2a41f07'
+branch_labels = None
+depends_on = None
+
+# Existing votes and tallies belong to the election the app is running. It
+# names a partition, so it's held to vote_log.ELECTION_PATTERN.
+ELECTION_ID = os.getenv('ELECTION_ID', 'main')
+if not re.match(r'^[a-z0-9_]{1,40}$', ELECTION_ID):
+    raise ValueError(f'Invalid ELECTION_ID {ELECTION_ID!r}')
+
+VOTE_COLUMNS = 'id, candidate_id, voter_phone, category, election, channel, created_at'
+
+
+def upgrade():
+    with op.batch_alter_table('votes', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('election', sa.String(length=40), nullable=False, server_default=ELECTION_ID))
+        batch_op.add_column(sa.Column('channel', sa.String(length=10), nullable=False, server_default='web'))
+        batch_op.add_column(sa.Column('created_at', sa.DateTime(), nullable=True))
+
+    with op.batch_alter_table('votes', schema=None) as batch_op:
+        batch_op.alter_column('election', server_default=None)
+        batch_op.alter_column('channel', server_default=None)
+        batch_op.drop_constraint('uq_votes_voter_phone_candidate_id', type_='unique')
+        batch_op.drop_index('ix_votes_candidate_id_category')
+        batch_op.create_unique_constraint(
+            'uq_votes_election_voter_phone_candidate_id', ['election', 'voter_phone', 'candidate_id']
+        )
+        batch_op.create_index('ix_votes_election_candidate_id_category', ['election', 'candidate_id', 'category'], unique=False)
+
+    with op.batch_alter_table('vote_tally', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('election', sa.String(length=40), nullable=False, server_default=ELECTION_ID))
+
+    with op.batch_alter_table('vote_tally', schema=None) as batch_op:
+        batch_op.alter_column('election', server_default=None)
+        batch_op.drop_constraint('uq_vote_tally_candidate_id_category', type_='unique')
+        batch_op.create_unique_constraint(
+            'uq_vote_tally_election_candidate_id_category', ['election', 'candidate_id', 'category']
+        )
+
+    if op.get_bind().dialect.name == 'postgresql':
+        partition_votes()
+
+
+def partition_votes():
+    # Postgres can't turn a table into a partitioned one in place: build the
+    # partitioned table, copy the votes across and swap it in. Unique keys on
+    # a partitioned table must include the partition key, hence (id, election).
+    op.execute('ALTER TABLE votes RENAME TO votes_unpartitioned')
+    op.execute('ALTER TABLE votes_unpartitioned RENAME CONSTRAINT votes_pkey TO votes_unpartitioned_pkey')
+    op.execute('ALTER TABLE votes_unpartitioned RENAME CONSTRAINT uq_votes_election_voter_phone_candidate_id TO uq_votes_unpartitioned')
+    op.execute('ALTER INDEX ix_votes_election_candidate_id_category RENAME TO ix_votes_unpartitioned')
+    op.execute('CREATE TABLE votes (LIKE votes_unpartitioned INCLUDING DEFAULTS) PARTITION BY LIST (election)')
+    op.execute('ALTER TABLE votes ADD PRIMARY KEY (id, election)')
+    op.execute(
+        'ALTER TABLE votes ADD CONSTRAINT uq_votes_election_voter_phone_candidate_id '
+        'UNIQUE (election, voter_phone, candidate_id)'
+    )
+    op.execute('ALTER TABLE votes ADD FOREIGN KEY (candidate_id) REFERENCES candidate (id)')
+    op.execute('CREATE INDEX ix_votes_election_candidate_id_category ON votes (election, candidate_id, category)')
+    op.execute('CREATE TABLE votes_default PARTITION OF votes DEFAULT')
+    op.execute(f"CREATE TABLE votes_{ELECTION_ID} PARTITION OF votes FOR VALUES IN ('{ELECTION_ID}')")
+    op.execute(f'INSERT INTO votes ({VOTE_COLUMNS}) SELECT {VOTE_COLUMNS} FROM votes_unpartitioned')
+    # The id sequence belongs to the old table's column and would go with it.
+    op.execute('ALTER SEQUENCE votes_id_seq OWNED BY votes.id')
+    op.execute('DROP TABLE votes_unpartitioned')
+
+
+def unpartition_votes():
+    op.execute('ALTER TABLE votes RENAME TO votes_partitioned')
+    op.execute('ALTER TABLE votes_partitioned RENAME CONSTRAINT votes_pkey TO votes_partitioned_pkey')
+    op.execute('ALTER TABLE votes_partitioned RENAME CONSTRAINT uq_votes_election_voter_phone_candidate_id TO uq_votes_partitioned')
+    op.execute('ALTER INDEX ix_votes_election_candidate_id_category RENAME TO ix_votes_partitioned')
+    op.execute('CREATE TABLE votes (LIKE votes_partitioned INCLUDING DEFAULTS)')
+    op.execute('ALTER TABLE votes ADD PRIMARY KEY (id)')
+    op.execute(
+        'ALTER TABLE votes ADD CONSTRAINT uq_votes_election_voter_phone_candidate_id '
+        'UNIQUE (election, voter_phone, candidate_id)'
+    )
+    op.execute('ALTER TABLE votes ADD FOREIGN KEY (candidate_id) REFERENCES candidate (id)')
+    op.execute('CREATE INDEX ix_votes_election_candidate_id_category ON votes (election, candidate_id, category)')
+    op.execute(f'INSERT INTO votes ({VOTE_COLUMNS}) SELECT {VOTE_COLUMNS} FROM votes_partitioned')
+    op.execute('ALTER SEQUENCE votes_id_seq OWNED BY votes.id')
+    op.execute('DROP TABLE votes_partitioned CASCADE')
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        unpartition_votes()
+
+    # Only the open election's votes fit the old one-vote-per-phone constraint.
+    op.execute(sa.text('DELETE FROM votes WHERE election != :election').bindparams(election=ELECTION_ID))
+    op.execute(sa.text('DELETE FROM vote_tally WHERE election != :election').bindparams(election=ELECTION_ID))
+
+    with op.batch_alter_table('vote_tally', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_vote_tally_election_candidate_id_category', type_='unique')
+        batch_op.create_unique_constraint('uq_vote_tally_candidate_id_category', ['candidate_id', 'category'])
+        batch_op.drop_column('election')
+
+    with op.batch_alter_table('votes', schema=None) as batch_op:
+        batch_op.drop_index('ix_votes_election_candidate_id_category')
+        batch_op.drop_constraint('uq_votes_election_voter_phone_candidate_id', type_='unique')
+        batch_op.create_unique_constraint('uq_votes_voter_phone_candidate_id', ['voter_phone', 'candidate_id'])
+        batch_op.create_index('ix_votes_candidate_id_category', ['candidate_id', 'category'], unique=False)
+        batch_op.drop_column('created_at')
+        batch_op.drop_column('channel')
+        batch_op.drop_column('election')
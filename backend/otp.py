@@ -0,0 +1,108 @@
+import logging
+import os
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+logger = logging.getLogger(__name__)
+
+
+class TwilioOtpProvider:
+    def __init__(self, account_sid, auth_token, service_sid):
+        self.account_sid = account_sid
+        self.auth_token = auth_token
+        self.service_sid = service_sid
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        # Built on first use so importing the app never touches Twilio.
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from twilio.rest import Client
+                    self._client = Client(self.account_sid, self.auth_token)
+        return self._client
+
+    def send(self, phone_number):
+        verification = self.client.verify.v2.services(self.service_sid) \
+            .verifications.create(to=phone_number, channel='sms')
+        return verification.status
+
+    def check(self, phone_number, code):
+        verification_check = self.client.verify.v2.services(self.service_sid) \
+            .verification_checks.create(to=phone_number, code=code)
+        return verification_check.status == 'approved'
+
+
+class LocalOtpProvider:
+    # Keeps codes in memory and logs them instead of sending an SMS, for tests
+    # and load runs. Codes live in one worker, so multi-worker runs should set
+    # a fixed code that every worker accepts.
+
+    def __init__(self, fixed_code=None):
+        self.fixed_code = fixed_code
+        self._codes = {}
+        self._lock = threading.Lock()
+
+    def send(self, phone_number):
+        code = self.fixed_code or f'{secrets.randbelow(10 ** 6):06d}'
+        with self._lock:
+            self._codes[phone_number] = code
+        logger.info('Local OTP code %s', code, extra={'fields': {'phone_number': phone_number}})
+        return 'pending'
+
+    def check(self, phone_number, code):
+        if self.fixed_code:
+            return code == self.fixed_code
+        with self._lock:
+            if self._codes.get(phone_number) != code:
+                return False
+            del self._codes[phone_number]
+        return True
+
+
+class OtpDispatcher:
+    # Sends OTPs on a small thread pool so a request never waits on the SMS
+    # provider. `record_result(request_id, status, error)` runs in an app
+    # context once the provider has answered.
+
+    def __init__(self, provider, record_result, workers=4, app=None):
+        self.app = app
+        self.provider = provider
+        self.record_result = record_result
+        self.workers = workers
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+
+    def submit(self, request_id, phone_number):
+        self._get_executor().submit(self._send, request_id, phone_number)
+
+    def _get_executor(self):
+        pid = os.getpid()
+        if self._executor is None or self._pid != pid:
+            with self._lock:
+                if self._executor is None or self._pid != pid:
+                    # Pool threads don't survive a fork; each worker gets its own.
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='otp')
+                    self._pid = pid
+        return self._executor
+
+    def _send(self, request_id, phone_number):
+        try:
+            status, error = self.provider.send(phone_number), None
+        except Exception as e:
+            logger.exception('Sending OTP failed', extra={'fields': {'request_id': request_id, 'phone_number': phone_number}})
+            status, error = 'failed', str(e)
+
+        try:
+            with self.app.app_context():
+                self.record_result(request_id, status, error)
+        except Exception:
+            logger.exception('Recording OTP request %s failed', request_id)
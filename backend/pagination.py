@@ -0,0 +1,62 @@
+import json
+
+from flask import Response, jsonify, request, stream_with_context
+
+
+MAX_PAGE_SIZE = 1000
+STREAM_CHUNK_ROWS = 500
+
+
+def page_args():
+    # ?after_id=<id>&limit=<n> for keyset pages, ?stream=1 for a streamed body.
+    after_id = request.args.get('after_id', type=int)
+    limit = request.args.get('limit', type=int)
+    if limit is not None:
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+    stream = request.args.get('stream', '').lower() in ('1', 'true', 'yes')
+    return after_id, limit, stream
+
+
+def keyset(query, column, after_id=None, limit=None):
+    if after_id is not None:
+        query = query.filter(column > after_id)
+    query = query.order_by(column)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+def next_cursor(ids, limit):
+    # The after_id for the next page, or None when this was the last one.
+    if limit is None or len(ids) < limit:
+        return None
+    return ids[-1]
+
+
+def page_response(key, items, limit=None, next_after_id=None):
+    body = {key: items}
+    if limit is not None:
+        body['next_after_id'] = next_after_id
+    return jsonify(body)
+
+
+def stream_json(key, query, serialize):
+    # Same body as page_response(key, ...) without next_after_id, written out
+    # a chunk at a time from a server-side cursor so memory stays flat.
+    def generate():
+        yield '{%s: [' % json.dumps(key)
+
+        first = True
+        chunk = []
+        for row in query.yield_per(STREAM_CHUNK_ROWS):
+            chunk.append(json.dumps(serialize(row)))
+            if len(chunk) == STREAM_CHUNK_ROWS:
+                yield ('' if first else ',') + ','.join(chunk)
+                first = False
+                chunk = []
+
+        if chunk:
+            yield ('' if first else ',') + ','.join(chunk)
+        yield ']}'
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
@@ -0,0 +1,64 @@
+import logging
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_budget(limit):
+    # Declares how many SQL statements a view may run per request. Going over
+    # raises under TESTING (so N+1 regressions fail the suite) and logs a
+    # warning otherwise.
+    def decorator(view):
+        view.query_budget = limit
+        return view
+    return decorator
+
+
+def count_statement(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g.query_count = g.get('query_count', 0) + 1
+
+
+def init_query_budget(app):
+    # Engine events are process-wide; only the first app registers them.
+    if not event.contains(Engine, 'before_cursor_execute', count_statement):
+        event.listen(Engine, 'before_cursor_execute', count_statement)
+
+    @app.after_request
+    def check_query_budget(response):
+        view = app.view_functions.get(request.endpoint)
+        limit = getattr(view, 'query_budget', None)
+        if limit is None:
+            return response
+
+        if response.is_streamed:
+            # A streamed body runs its queries after this hook, on the same g
+            # (stream_with_context), so the budget is checked once it's sent.
+            response.response = checked_stream(
+                response.response, g._get_current_object(), request.endpoint, limit, app.config.get('TESTING')
+            )
+            return response
+
+        check(g.get('query_count', 0), request.endpoint, limit, app.config.get('TESTING'))
+        return response
+
+
+def checked_stream(body, request_g, endpoint, limit, testing):
+    yield from body
+    check(request_g.get('query_count', 0), endpoint, limit, testing)
+
+
+def check(count, endpoint, limit, testing):
+    if count > limit:
+        message = f'{endpoint} ran {count} SQL statements, budget is {limit}'
+        if testing:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
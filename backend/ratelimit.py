@@ -0,0 +1,260 @@
+import functools
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from flask import jsonify, request
+
+
+logger = logging.getLogger(__name__)
+
+
+def parse_limit(value):
+    # 'capacity/seconds', e.g. '5/60' allows bursts of 5 and refills to 5 over
+    # a minute. Empty or '0' turns the limit off.
+    value = (value or '').strip()
+    if not value or value == '0':
+        return None
+    capacity, period = value.split('/', 1)
+    return int(capacity), float(period)
+
+
+class Limit:
+    # A token bucket per distinct key_func() value; requests for which
+    # key_func() returns nothing aren't counted against this limit.
+
+    def __init__(self, scope, capacity, period, key_func):
+        self.scope = scope
+        self.capacity = capacity
+        self.period = period
+        self.rate = capacity / period
+        self.key_func = key_func
+
+
+def limits(scope, value, key_func):
+    # Limit from a parse_limit() string, as a list so disabled ones drop out.
+    parsed = parse_limit(value)
+    return [Limit(scope, parsed[0], parsed[1], key_func)] if parsed else []
+
+
+def bucket(endpoint, limit, key):
+    # (key, capacity, rate) for the stores. Buckets are per endpoint, so the
+    # same phone has separate budgets for /vote and /verify_and_send_otp.
+    return (f'{endpoint}:{limit.scope}:{key}', limit.capacity, limit.rate)
+
+
+def client_ip():
+    # Set TRUSTED_PROXIES in app.py behind nginx, or this is the proxy's address.
+    return request.remote_addr
+
+
+def whole_route():
+    return '*'
+
+
+class SqliteBucketStore:
+    # Token buckets in a SQLite file on local disk, shared by every gunicorn
+    # worker on the host, like the idempotency store. take() updates all of
+    # a request's buckets in one transaction: either every bucket gives up a
+    # token or none does. Nothing here is worth an fsync, so there isn't one.
+
+    def __init__(self, path, prune_every=1000):
+        self.path = path
+        self.prune_every = prune_every
+        self._local = threading.local()
+        self._takes = 0
+
+    def take(self, buckets):
+        # `buckets` is [(key, capacity, rate)]. Returns None when a token was
+        # taken from each, otherwise (index, seconds) for the bucket that
+        # needs the longest wait.
+        return self.take_groups([buckets])[0]
+
+    def take_groups(self, groups):
+        # take() for each group of buckets in turn, in one transaction, so a
+        # batch of votes is one round trip. Returns take()'s answer per group.
+        now = time.time()
+        results = []
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            for buckets in groups:
+                connection.execute('SAVEPOINT bucket_group')
+                denied = None
+                for key, capacity, rate in buckets:
+                    # The WHERE on DO UPDATE leaves an empty bucket alone and
+                    # returns no row.
+                    taken = connection.execute(
+                        'INSERT INTO rate_buckets (key, tokens, updated_at, idle_after) VALUES (?1, ?2 - 1, ?4, ?4 + ?2 / ?3) '
+                        'ON CONFLICT (key) DO UPDATE SET '
+                        'tokens = min(?2, tokens + (?4 - updated_at) * ?3) - 1, updated_at = ?4, idle_after = ?4 + ?2 / ?3 '
+                        'WHERE min(?2, tokens + (?4 - updated_at) * ?3) >= 1 '
+                        'RETURNING tokens',
+                        (key, capacity, rate, now)
+                    ).fetchone()
+                    if taken is None:
+                        connection.execute('ROLLBACK TO bucket_group')
+                        denied = self._longest_wait(connection, buckets, now)
+                        break
+                connection.execute('RELEASE bucket_group')
+                results.append(denied)
+            connection.execute('COMMIT')
+        except BaseException:
+            if connection.in_transaction:
+                connection.execute('ROLLBACK')
+            raise
+
+        self._takes += len(groups)
+        if self._takes >= self.prune_every:
+            self._takes = 0
+            self.prune()
+        return results
+
+    def prune(self):
+        # A bucket idle for its whole period is full again, the same as no row.
+        connection = self._connection()
+        connection.execute('DELETE FROM rate_buckets WHERE idle_after <= ?', (time.time(),))
+
+    def _longest_wait(self, connection, buckets, now):
+        longest = None
+        for index, (key, capacity, rate) in enumerate(buckets):
+            row = connection.execute('SELECT tokens, updated_at FROM rate_buckets WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                continue
+            tokens = min(capacity, row[0] + (now - row[1]) * rate)
+            if tokens < 1 and (longest is None or (1 - tokens) / rate > longest[1]):
+                longest = (index, (1 - tokens) / rate)
+        return longest
+
+    def _connection(self):
+        # One connection per thread, and new ones after a fork.
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=1, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=OFF')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS rate_buckets ('
+                'key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL, idle_after REAL NOT NULL'
+                ') WITHOUT ROWID'
+            )
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+
+# KEYS are the buckets, ARGV their capacity, rate and group in triples, with
+# each group's buckets next to each other. Same contract as
+# SqliteBucketStore.take_groups: nothing is taken from a group unless every
+# bucket in it has a token. Returns a (denied index, seconds) pair per group,
+# flattened, with 0 for a group that got its tokens. Redis' clock is used so
+# app servers with skewed clocks agree.
+TAKE_SCRIPT = '''
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local levels, limits, results = {}, {}, {}
+local first = 1
+while first <= #KEYS do
+    local last = first
+    while last < #KEYS and ARGV[3 * last + 3] == ARGV[3 * first] do
+        last = last + 1
+    end
+
+    local denied, longest = 0, 0
+    for i = first, last do
+        local key, capacity, rate = KEYS[i], tonumber(ARGV[3 * i - 2]), tonumber(ARGV[3 * i - 1])
+        if levels[key] == nil then
+            local bucket = redis.call('HMGET', key, 'tokens', 'updated_at')
+            local tokens = tonumber(bucket[1]) or capacity
+            levels[key] = math.min(capacity, tokens + (now - (tonumber(bucket[2]) or now)) * rate)
+        end
+        if levels[key] < 1 and (1 - levels[key]) / rate > longest then
+            denied, longest = i - first + 1, (1 - levels[key]) / rate
+        end
+    end
+
+    if denied == 0 then
+        for i = first, last do
+            levels[KEYS[i]] = levels[KEYS[i]] - 1
+            limits[KEYS[i]] = {tonumber(ARGV[3 * i - 2]), tonumber(ARGV[3 * i - 1])}
+        end
+    end
+    table.insert(results, denied)
+    table.insert(results, tostring(longest))
+    first = last + 1
+end
+
+for key, limit in pairs(limits) do
+    redis.call('HSET', key, 'tokens', tostring(levels[key]), 'updated_at', tostring(now))
+    redis.call('PEXPIRE', key, math.ceil(limit[1] / limit[2] * 1000))
+end
+return results
+'''
+
+
+class RedisBucketStore:
+    # For app servers on more than one host. Needs the redis package, which
+    # isn't in requirements.txt because a single host doesn't need it.
+
+    def __init__(self, url, prefix='ratelimit:'):
+        import redis
+
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url, socket_timeout=0.25)
+        self._take = self._client.register_script(TAKE_SCRIPT)
+
+    def take(self, buckets):
+        return self.take_groups([buckets])[0]
+
+    def take_groups(self, groups):
+        keys = [self.prefix + key for buckets in groups for key, capacity, rate in buckets]
+        args = [
+            value
+            for group, buckets in enumerate(groups)
+            for key, capacity, rate in buckets
+            for value in (capacity, rate, group)
+        ]
+        # Groups without buckets aren't sent and always get their tokens.
+        answers = iter(self._take(keys=keys, args=args) if keys else [])
+        results = []
+        for buckets in groups:
+            if not buckets:
+                results.append(None)
+                continue
+            index, seconds = next(answers), next(answers)
+            results.append((int(index) - 1, float(seconds)) if int(index) else None)
+        return results
+
+
+def rate_limited(store, *limits):
+    # Answers 429 with Retry-After once any of `limits` runs dry for this
+    # request, before the view runs. Buckets are per endpoint, so the same
+    # phone has separate budgets for /vote and /verify_and_send_otp. If the
+    # store itself fails the request is let through: losing the limiter must
+    # not take voting down with it.
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            buckets = []
+            for limit in limits:
+                key = limit.key_func()
+                if key:
+                    buckets.append(bucket(request.endpoint, limit, key))
+
+            denied = None
+            if buckets:
+                try:
+                    denied = store.take(buckets)
+                except Exception:
+                    logger.warning('Rate limiter unavailable, letting the request through', exc_info=True)
+
+            if denied is not None:
+                retry_after = max(1, math.ceil(denied[1]))
+                return jsonify({'error': 'Too many requests, please try again later'}), 429, {'Retry-After': str(retry_after)}
+            return view(*args, **kwargs)
+
+        return wrapper
+    return decorator
@@ -0,0 +1,80 @@
+import math
+import time
+
+from flask import g, has_request_context, request
+from flask_sqlalchemy.session import Session
+
+
+REPLICA_BIND = 'replica'
+PIN_COOKIE = 'read_primary'
+WRITE_METHODS = {'POST', 'PUT', 'PATCH', 'DELETE'}
+
+
+def read_replica(view):
+    # Marks a view that only reads, so its queries may be served by the
+    # replica bind. Writes flushed from such a view still go to the primary.
+    view.read_replica = True
+    return view
+
+
+class RoutingSession(Session):
+    # Sends queries to the replica engine while the current request has been
+    # routed there (see init_replica_routing); everything else, and every
+    # flush, uses the normal binds.
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and reading_replica():
+            return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def init_replica_routing(app, db, pin_seconds=5):
+    # Read-your-writes: a successful write sets a cookie holding a deadline,
+    # and a client presenting one that hasn't passed reads from the primary
+    # until replication has had `pin_seconds` to catch up. Without a replica
+    # bind configured this is a no-op and every query uses the primary.
+    #
+    # The pin only works where the browser sends the cookie back. Secure
+    # cookies (REPLICA_PIN_COOKIE_SECURE, or any https request) are SameSite=None
+    # so a frontend on another site can send them, but browsers that block
+    # third-party cookies won't; only same-site clients are sure to be pinned,
+    # and the rest may read data up to the replica's lag behind their writes.
+    if REPLICA_BIND not in app.config.get('SQLALCHEMY_BINDS', {}):
+        return
+
+    @app.before_request
+    def route_reads():
+        view = app.view_functions.get(request.endpoint)
+        g.use_replica = (
+            getattr(view, 'read_replica', False)
+            and request.method in ('GET', 'HEAD')
+            and not pinned_to_primary()
+        )
+
+    @app.after_request
+    def pin_writer(response):
+        if request.method in WRITE_METHODS and response.status_code < 400 and pin_seconds > 0:
+            # Behind a TLS-terminating proxy request.is_secure is False unless
+            # TRUSTED_PROXIES lets ProxyFix see X-Forwarded-Proto.
+            secure = app.config.get('REPLICA_PIN_COOKIE_SECURE', False) or request.is_secure
+            response.set_cookie(
+                PIN_COOKIE, str(math.ceil(time.time() + pin_seconds)),
+                max_age=pin_seconds,
+                secure=secure,
+                httponly=True,
+                samesite='None' if secure else 'Lax'
+            )
+        return response
+
+
+def reading_replica():
+    return has_request_context() and bool(g.get('use_replica'))
+
+
+def pinned_to_primary():
+    # The deadline is checked here as well as by the cookie's max-age, so
+    # clients that keep cookies too long are not pinned forever.
+    try:
+        return float(request.cookies.get(PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
@@ -0,0 +1,154 @@
+import functools
+import gzip
+import hashlib
+import itertools
+import threading
+import time
+
+from flask import Response, current_app, request
+from sqlalchemy import event, select, update
+
+
+VERSION_ID = 1
+
+
+class Snapshot:
+    def __init__(self, body, min_gzip_bytes):
+        self.body = body
+        self.etag = '"%s"' % hashlib.sha256(body).hexdigest()[:32]
+        # Strong ETags name one representation, so the gzipped body has its own.
+        if len(body) >= min_gzip_bytes:
+            self.gzipped = gzip.compress(body, compresslevel=6)
+            self.gzip_etag = self.etag[:-1] + '-gzip"'
+        else:
+            self.gzipped = None
+            self.gzip_etag = None
+
+
+class Generation:
+    # The snapshots built from one database, and the generation they're from.
+
+    def __init__(self):
+        self.value = None
+        self.checked_at = None
+        self.snapshots = {}
+
+
+class SnapshotCache:
+    # Keeps the serialized JSON of read-only views in worker memory, plain
+    # and gzipped, keyed by endpoint and query string. Every flush that
+    # touches one of `watched_models` bumps a generation counter in the
+    # database in the same transaction; each worker reads it at most every
+    # `check_seconds` and drops its snapshots when it has moved, so other
+    # workers' writes show within that time and this worker's immediately.
+    # Responses carry a strong ETag and a matching If-None-Match gets a 304.
+    #
+    # `source()` names the database the request reads from, so snapshots
+    # built from a lagging replica are never taken for the primary's.
+    # Requests for which `bypass()` is true skip the cache.
+
+    def __init__(self, db, version_model, watched_models, check_seconds=1, max_entries=256, min_gzip_bytes=1024,
+                 source=None, bypass=None):
+        self.db = db
+        self.Version = version_model
+        self.watched_models = tuple(watched_models)
+        self.check_seconds = check_seconds
+        self.max_entries = max_entries
+        self.min_gzip_bytes = min_gzip_bytes
+        self.source = source
+        self.bypass = bypass
+        self._lock = threading.Lock()
+        self._generations = {}
+
+        event.listen(db.session, 'after_flush', self._after_flush)
+        event.listen(db.session, 'after_commit', self._after_commit)
+        event.listen(db.session, 'after_soft_rollback', self._after_rollback)
+
+    def _after_flush(self, session, flush_context):
+        changed = itertools.chain(session.new, session.dirty, session.deleted)
+        if any(isinstance(obj, self.watched_models) for obj in changed):
+            self.bump(session)
+
+    def bump(self, session=None):
+        # For writes that bypass the ORM unit of work (bulk inserts); commits
+        # with the caller's transaction.
+        session = session or self.db.session
+        Version = self.Version
+        session.connection().execute(
+            update(Version).where(Version.id == VERSION_ID).values(generation=Version.generation + 1)
+        )
+        session.info['snapshots_changed'] = True
+
+    def _after_commit(self, session):
+        if session.info.pop('snapshots_changed', False):
+            with self._lock:
+                for generation in self._generations.values():
+                    generation.checked_at = None
+
+    def _after_rollback(self, session, previous_transaction):
+        if not session.in_transaction():
+            session.info.pop('snapshots_changed', None)
+
+    def _current_generation(self):
+        source = self.source() if self.source else None
+        with self._lock:
+            generation = self._generations.setdefault(source, Generation())
+
+        now = time.monotonic()
+        if generation.checked_at is not None and now - generation.checked_at < self.check_seconds:
+            return generation
+
+        Version = self.Version
+        value = self.db.session.execute(
+            select(Version.generation).where(Version.id == VERSION_ID)
+        ).scalar()
+        with self._lock:
+            if value != generation.value:
+                generation.value = value
+                generation.snapshots = {}
+            generation.checked_at = now
+        return generation
+
+    def cached(self, view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if self.bypass and self.bypass():
+                return view(*args, **kwargs)
+
+            generation = self._current_generation()
+            value, snapshots = generation.value, generation.snapshots
+            if value is None:
+                # No version row: nothing would ever invalidate a snapshot.
+                return view(*args, **kwargs)
+
+            key = (request.endpoint, tuple(sorted(request.args.items(multi=True))))
+            snapshot = snapshots.get(key)
+            if snapshot is None:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed or response.mimetype != 'application/json':
+                    return response
+
+                snapshot = Snapshot(response.get_data(), self.min_gzip_bytes)
+                with self._lock:
+                    # Unless the generation moved on while the view ran.
+                    if generation.snapshots is snapshots:
+                        if len(snapshots) >= self.max_entries:
+                            snapshots.pop(next(iter(snapshots)))
+                        snapshots[key] = snapshot
+
+            return self._respond(snapshot)
+
+        return wrapper
+
+    def _respond(self, snapshot):
+        gzipped = snapshot.gzipped is not None and request.accept_encodings['gzip'] > 0
+        etag = snapshot.gzip_etag if gzipped else snapshot.etag
+        headers = {'ETag': etag, 'Vary': 'Accept-Encoding', 'Cache-Control': 'no-cache'}
+
+        if request.if_none_match.contains(etag.strip('"')):
+            return Response(status=304, headers=headers)
+
+        if gzipped:
+            headers['Content-Encoding'] = 'gzip'
+            return Response(snapshot.gzipped, mimetype='application/json', headers=headers)
+        return Response(snapshot.body, mimetype='application/json', headers=headers)
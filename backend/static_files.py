@@ -0,0 +1,44 @@
+import mimetypes
+import os
+
+from flask import Response, abort, request, send_file
+from werkzeug.security import safe_join
+
+from images import is_content_hashed
+
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+MUTABLE_MAX_AGE = 3600
+
+
+def send_upload(folder, filename, offload=None, accel_prefix='/protected/profile_folder'):
+    # Content-hashed files are cached forever and get their name as a strong
+    # ETag; anything else is cached for an hour and revalidated against
+    # werkzeug's mtime/size ETag. If-None-Match/Range are answered by
+    # send_file (304/206).
+    #
+    # offload='x-accel' hands the bytes to nginx via X-Accel-Redirect (with
+    # `accel_prefix` mapped to `folder` as an internal location), so the
+    # worker only sends headers. X-Sendfile is Flask's USE_X_SENDFILE.
+    path = safe_join(folder, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+
+    immutable = is_content_hashed(filename)
+    max_age = IMMUTABLE_MAX_AGE if immutable else MUTABLE_MAX_AGE
+    etag = os.path.basename(filename) if immutable else True
+
+    if offload == 'x-accel':
+        response = Response(mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+        response.headers['X-Accel-Redirect'] = f"{accel_prefix.rstrip('/')}/{filename}"
+        response.cache_control.max_age = max_age
+        if immutable:
+            response.set_etag(etag)
+            response.make_conditional(request)
+    else:
+        response = send_file(path, max_age=max_age, etag=etag, conditional=True)
+
+    response.cache_control.public = True
+    if immutable:
+        response.cache_control.immutable = True
+    return response
@@ -0,0 +1,306 @@
+import datetime
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+
+from sqlalchemy import and_, func, insert, or_, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
+
+
+logger = logging.getLogger(__name__)
+
+# tally_progress holds a single row.
+PROGRESS_ID = 1
+
+
+class TallyKeeper:
+    # Keeps one tally row per (election, candidate, category) equal to the
+    # number of votes for it. A background thread in each worker folds in votes past the
+    # high-water mark in the progress row, `chunk_size` at a time. Ids skipped
+    # on the way up may belong to a transaction that hasn't committed yet, so
+    # they stay pending (and are picked up if they appear) for `gap_seconds`,
+    # as long as they are within `pending_window` ids of the mark. Rolled back
+    # inserts leave gaps that never fill, and this keeps them from piling up.
+    # Every `reconcile_seconds` one worker recounts `election`'s votes behind
+    # the mark a chunk of candidates at a time and repairs any tally that
+    # disagrees; closed elections are left alone, archived or not.
+    # Whatever writes tallies first writes the progress row, which holds its
+    # row lock (SQLite: the database write lock) until commit, so the
+    # folding and the recount never interleave.
+
+    def __init__(self, db, vote_model, tally_model, progress_model, candidate_model, election,
+                 chunk_size=5000, poll_seconds=1, gap_seconds=60, pending_window=5000,
+                 reconcile_seconds=600, reconcile_chunk=500, app=None):
+        self.app = app
+        self.db = db
+        self.Vote = vote_model
+        self.Tally = tally_model
+        self.Progress = progress_model
+        self.Candidate = candidate_model
+        self.election = election
+        self.chunk_size = chunk_size
+        self.poll_seconds = poll_seconds
+        self.gap_seconds = gap_seconds
+        self.pending_window = pending_window
+        self.reconcile_seconds = reconcile_seconds
+        self.reconcile_chunk = reconcile_chunk
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def init_app(self, app):
+        self.app = app
+        app.before_request(self.ensure_started)
+
+    def ensure_started(self):
+        pid = os.getpid()
+        if self._pid == pid and self._thread is not None and self._thread.is_alive():
+            return
+
+        with self._lock:
+            if self._pid != pid or self._thread is None or not self._thread.is_alive():
+                self._pid = pid
+                self._thread = threading.Thread(target=self._run, name='tally-keeper', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        next_reconcile = time.monotonic() + self.reconcile_seconds
+        while True:
+            try:
+                with self.app.app_context():
+                    applied = self.apply_new_votes()
+                    if applied < self.chunk_size and self.reconcile_seconds and time.monotonic() >= next_reconcile:
+                        next_reconcile = time.monotonic() + self.reconcile_seconds
+                        if self._claim_reconcile():
+                            self.reconcile()
+            except Exception:
+                logger.exception('Tally update failed')
+                applied = 0
+
+            # A full chunk means there may be more waiting.
+            if applied < self.chunk_size:
+                time.sleep(self.poll_seconds)
+
+    def catch_up(self):
+        total = 0
+        while True:
+            applied = self.apply_new_votes()
+            total += applied
+            if applied < self.chunk_size:
+                return total
+
+    def apply_new_votes(self):
+        # Folds up to chunk_size votes the tallies haven't seen into them and
+        # returns how many.
+        Vote = self.Vote
+        session = self.db.session
+
+        # Most polls find nothing new; find that out without taking the lock.
+        progress = session.execute(
+            select(self.Progress.last_vote_id, self.Progress.pending_vote_ids).where(self.Progress.id == PROGRESS_ID)
+        ).first()
+        newest = session.execute(select(func.max(Vote.id))).scalar() or 0
+        if progress is not None and progress.pending_vote_ids == '{}' and newest <= progress.last_vote_id:
+            session.commit()
+            return 0
+
+        last_vote_id, pending, _ = self._lock_progress()
+        rows = session.execute(
+            select(Vote.id, Vote.election, Vote.candidate_id, Vote.category)
+            .where(or_(Vote.id > last_vote_id, Vote.id.in_(list(pending))))
+            .order_by(Vote.id)
+            .limit(self.chunk_size)
+        ).all()
+
+        now = time.time()
+        deltas = Counter()
+        for vote_id, election, candidate_id, category in rows:
+            deltas[(election, candidate_id, category)] += 1
+            if vote_id > last_vote_id:
+                pending.update(dict.fromkeys(range(last_vote_id + 1, vote_id), now))
+                last_vote_id = vote_id
+            else:
+                pending.pop(vote_id, None)
+        pending = {
+            vote_id: seen for vote_id, seen in pending.items()
+            if now - seen < self.gap_seconds and vote_id > last_vote_id - self.pending_window
+        }
+
+        # Fixed order, so tally rows are always locked the same way round.
+        for key in sorted(deltas):
+            self._write(key, self.Tally.vote_count + deltas[key], deltas[key])
+        self._save_progress(last_vote_id=last_vote_id, pending_vote_ids=json.dumps(pending))
+        session.commit()
+        return len(rows)
+
+    def live_counts(self, keys=None):
+        # {(candidate_id, category): vote_count} in `election` as of now, for
+        # `keys` or every tallied candidate: the tally plus the committed votes
+        # not folded in yet, which is what the tally will say once they are.
+        Vote, Progress, Tally = self.Vote, self.Progress, self.Tally
+        session = self.db.session
+        tally_keys = Tally.election == self.election
+        vote_keys = Vote.election == self.election
+        if keys is not None:
+            keys = sorted(set(keys))
+            if not keys:
+                return {}
+            tally_keys = and_(tally_keys, tuple_(Tally.candidate_id, Tally.category).in_(keys))
+            vote_keys = and_(vote_keys, tuple_(Vote.candidate_id, Vote.category).in_(keys))
+
+        # One statement, so the tallies and the mark they're up to agree.
+        rows = session.execute(
+            select(Progress.last_vote_id, Progress.pending_vote_ids, Tally.candidate_id, Tally.category, Tally.vote_count)
+            .select_from(Progress)
+            .outerjoin(Tally, tally_keys)
+            .where(Progress.id == PROGRESS_ID)
+        ).all()
+
+        counts = dict.fromkeys(keys or (), 0)
+        last_vote_id, pending = 0, set()
+        for row in rows:
+            last_vote_id = row.last_vote_id
+            pending = {int(vote_id) for vote_id in json.loads(row.pending_vote_ids)}
+            if row.candidate_id is not None:
+                counts[(row.candidate_id, row.category)] = row.vote_count
+
+        # Votes never change once committed, so those past the mark, and the
+        # pending ones under it, are exactly the ones the tallies are missing.
+        # Normally a poll's worth.
+        for candidate_id, category, count in session.execute(
+            select(Vote.candidate_id, Vote.category, func.count())
+            .where(vote_keys, Vote.id > last_vote_id)
+            .group_by(Vote.candidate_id, Vote.category)
+        ):
+            counts[(candidate_id, category)] = counts.get((candidate_id, category), 0) + count
+
+        # Pending ids lie within pending_window of the mark: a bounded range.
+        if pending:
+            for vote_id, candidate_id, category in session.execute(
+                select(Vote.id, Vote.candidate_id, Vote.category)
+                .where(vote_keys, Vote.id.between(min(pending), last_vote_id))
+            ):
+                if vote_id in pending:
+                    counts[(candidate_id, category)] = counts.get((candidate_id, category), 0) + 1
+        return counts
+
+    def reconcile(self):
+        # Recounts every candidate in the election and returns the repairs
+        # made, as [(candidate_id, category, tallied, counted)].
+        repairs = []
+        after_id = 0
+        while after_id is not None:
+            chunk_repairs, after_id = self.reconcile_chunk_after(after_id)
+            repairs.extend(chunk_repairs)
+        return repairs
+
+    def reconcile_chunk_after(self, after_id):
+        # Returns this chunk's repairs and the after_id for the next chunk
+        # (None after the last).
+        Vote, Tally = self.Vote, self.Tally
+        session = self.db.session
+
+        last_vote_id, pending, _ = self._lock_progress()
+        candidate_ids = session.execute(
+            select(self.Candidate.id)
+            .where(self.Candidate.id > after_id)
+            .order_by(self.Candidate.id)
+            .limit(self.reconcile_chunk)
+        ).scalars().all()
+        if not candidate_ids:
+            session.commit()
+            return [], None
+
+        # Exactly the votes folded in so far: at or below the mark, not pending.
+        counted = {
+            (candidate_id, category): count
+            for candidate_id, category, count in session.execute(
+                select(Vote.candidate_id, Vote.category, func.count())
+                .where(
+                    Vote.election == self.election,
+                    Vote.candidate_id.in_(candidate_ids),
+                    Vote.id <= last_vote_id,
+                    Vote.id.not_in(list(pending))
+                )
+                .group_by(Vote.candidate_id, Vote.category)
+            )
+        }
+        tallied = {
+            (candidate_id, category): count
+            for candidate_id, category, count in session.execute(
+                select(Tally.candidate_id, Tally.category, Tally.vote_count)
+                .where(Tally.election == self.election, Tally.candidate_id.in_(candidate_ids))
+            )
+        }
+
+        repairs = []
+        for key in sorted(set(counted) | set(tallied)):
+            if counted.get(key, 0) != tallied.get(key, 0):
+                repairs.append((key[0], key[1], tallied.get(key, 0), counted.get(key, 0)))
+                self._write((self.election,) + key, counted.get(key, 0), counted.get(key, 0))
+        session.commit()
+
+        for candidate_id, category, was, now in repairs:
+            logger.warning('Repaired vote tally', extra={'fields': {
+                'election': self.election,
+                'candidate_id': candidate_id, 'category': category, 'tallied': was, 'counted': now
+            }})
+
+        next_after_id = candidate_ids[-1] if len(candidate_ids) == self.reconcile_chunk else None
+        return repairs, next_after_id
+
+    def _write(self, key, value, initial):
+        # Sets the tally to `value`, or creates it at `initial`. Only called
+        # under the progress lock, so nobody else can create it meanwhile.
+        Tally = self.Tally
+        election, candidate_id, category = key
+        updated = self.db.session.execute(
+            update(Tally)
+            .where(Tally.election == election, Tally.candidate_id == candidate_id, Tally.category == category)
+            .values(vote_count=value)
+        )
+        if not updated.rowcount:
+            self.db.session.execute(
+                insert(Tally).values(election=election, candidate_id=candidate_id, category=category, vote_count=initial)
+            )
+
+    def _claim_reconcile(self):
+        # The first worker to get here after reconcile_seconds does the recount.
+        _, _, reconciled_at = self._lock_progress()
+        now = datetime.datetime.utcnow()
+        if reconciled_at is not None and (now - reconciled_at).total_seconds() < self.reconcile_seconds:
+            self.db.session.commit()
+            return False
+
+        self._save_progress(reconciled_at=now)
+        self.db.session.commit()
+        return True
+
+    def _lock_progress(self):
+        # Returns (last_vote_id, pending {vote_id: first_missed}, reconciled_at)
+        # with the lock held until the caller commits.
+        Progress = self.Progress
+        session = self.db.session
+
+        if not self._save_progress().rowcount:
+            try:
+                with session.begin_nested():
+                    session.execute(insert(Progress).values(
+                        id=PROGRESS_ID, last_vote_id=0, pending_vote_ids='{}', updated_at=datetime.datetime.utcnow()
+                    ))
+            except IntegrityError:
+                # Another worker created it first.
+                self._save_progress()
+
+        row = session.execute(
+            select(Progress.last_vote_id, Progress.pending_vote_ids, Progress.reconciled_at).where(Progress.id == PROGRESS_ID)
+        ).one()
+        pending = {int(vote_id): seen for vote_id, seen in json.loads(row.pending_vote_ids).items()}
+        return row.last_vote_id, pending, row.reconciled_at
+
+    def _save_progress(self, **values):
+        values['updated_at'] = datetime.datetime.utcnow()
+        return self.db.session.execute(update(self.Progress).where(self.Progress.id == PROGRESS_ID).values(**values))
@@ -0,0 +1,126 @@
+import json
+import logging
+import os
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+class TallyStream:
+    # Fan-out of live vote counts for Server-Sent Events. Writers publish the
+    # latest count per candidate; each open stream wakes every `interval`
+    # seconds and sends whatever moved since its last event as one coalesced
+    # message, so a vote storm costs viewers one event per interval.
+    #
+    # Every stream holds a worker thread, so `max_clients` caps them per worker
+    # and `max_seconds` ends each stream periodically (EventSource reconnects).
+    # While any stream is open, one thread per worker calls `refresh` every
+    # `refresh_seconds` to pick up what other workers published; the streams
+    # themselves never touch the database.
+
+    def __init__(self, interval=1.0, heartbeat=15.0, max_clients=4, max_seconds=300,
+                 refresh=None, refresh_seconds=2, app=None):
+        self.app = app
+        self.interval = interval
+        self.heartbeat = heartbeat
+        self.max_clients = max_clients
+        self.max_seconds = max_seconds
+        self.refresh = refresh
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._version = 0
+        self._latest = {}
+        self._clients = 0
+        self._refresher = None
+        self._pid = None
+
+    def init_app(self, app):
+        self.app = app
+
+    def publish(self, category, candidate_id, vote_count):
+        with self._lock:
+            self._version += 1
+            self._latest.setdefault(category, {})[candidate_id] = (vote_count, self._version)
+
+    def version(self):
+        with self._lock:
+            return self._version
+
+    def changes_since(self, version, category=None):
+        with self._lock:
+            current = self._version
+            if category is not None:
+                latest = {category: self._latest.get(category, {})}
+            else:
+                latest = self._latest
+
+            changes = {}
+            for name, standings in latest.items():
+                moved = {
+                    candidate_id: vote_count
+                    for candidate_id, (vote_count, changed_at) in standings.items()
+                    if changed_at > version
+                }
+                if moved:
+                    changes[name] = moved
+
+        return current, changes
+
+    def acquire(self):
+        with self._lock:
+            if self._clients >= self.max_clients:
+                return False
+            self._clients += 1
+            if self.refresh is not None and (self._pid != os.getpid() or self._refresher is None):
+                self._pid = os.getpid()
+                self._refresher = threading.Thread(target=self._refresh_while_open, name='tally-stream-refresh', daemon=True)
+                self._refresher.start()
+            return True
+
+    def release(self):
+        with self._lock:
+            self._clients -= 1
+
+    def open_streams(self):
+        with self._lock:
+            return self._clients
+
+    def _refresh_while_open(self):
+        while True:
+            time.sleep(self.refresh_seconds)
+            with self._lock:
+                if not self._clients:
+                    # The next stream to open starts a new one.
+                    self._refresher = None
+                    return
+            try:
+                with self.app.app_context():
+                    self.refresh()
+            except Exception:
+                logger.exception('Refreshing live results failed')
+
+    def events(self, snapshot, since, category=None):
+        yield self._event('snapshot', snapshot)
+
+        started = last_sent = time.monotonic()
+        while time.monotonic() - started < self.max_seconds:
+            time.sleep(self.interval)
+
+            since, changes = self.changes_since(since, category)
+            now = time.monotonic()
+            if changes:
+                yield self._event('tally', changes)
+                last_sent = now
+            elif now - last_sent >= self.heartbeat:
+                yield ': keepalive\n\n'
+                last_sent = now
+
+    @staticmethod
+    def _event(name, categories):
+        data = {
+            category: {str(candidate_id): vote_count for candidate_id, vote_count in standings.items()}
+            for category, standings in categories.items()
+        }
+        return f'event: {name}\ndata: {json.dumps({"categories": data})}\n\n'
@@ -0,0 +1,57 @@
+import os
+
+import pytest
+
+
+# app.py reads its configuration at import time, so the environment has to
+# be in place before the first import.
+os.environ['APP_ENV'] = 'testing'
+os.environ.setdefault('TEST_DATABASE_URL', f'sqlite:////tmp/voting_test_{os.getpid()}.db')
+os.environ.setdefault('RATE_LIMIT_STORE_PATH', f'/tmp/voting_test_ratelimit_{os.getpid()}.sqlite3')
+os.environ.setdefault('TWILIO_ACCOUNT_SID', 'ACtest')
+os.environ.setdefault('TWILIO_AUTH_TOKEN', 'test')
+os.environ.setdefault('GATEWAY_API_KEYS', 'test-gateway-key')
+# Tests deliver queued mail themselves; keep the background sender idle.
+os.environ.setdefault('MAIL_QUEUE_POLL_SECONDS', '3600')
+
+import app as backend  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    with backend.app.app_context():
+        backend.db.drop_all()
+        backend.db.create_all()
+    backend.vote_filter.reset()
+    yield backend.app
+    with backend.app.app_context():
+        backend.db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def candidates(app):
+    # Two verified candidates in one category; returns their ids.
+    with app.app_context():
+        rows = [
+            backend.Candidate(full_name=f'Candidate {i}', email=f'candidate{i}@example.com', password='x')
+            for i in range(2)
+        ]
+        backend.db.session.add_all(rows)
+        backend.db.session.flush()
+        backend.db.session.add_all([
+            backend.Verification(
+                candidate_id=candidate.id,
+                phone_number=f'+2547{candidate.id:08d}',
+                national_id=f'ID{candidate.id:08d}',
+                is_verified=True,
+                category='Test Category'
+            )
+            for candidate in rows
+        ])
+        backend.db.session.commit()
+        return [candidate.id for candidate in rows]
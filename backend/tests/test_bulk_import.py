@@ -0,0 +1,51 @@
+import csv
+
+import app as backend
+
+
+ROWS = [
+    # email, full_name, phone_number, national_id
+    ('new@example.com', 'First Row', '+254733000001', 'NID001'),
+    ('new@example.com', 'Repeated Email', '+254733000002', 'NID002'),
+    ('candidate0@example.com', 'Existing Email', '+254733000003', 'NID003'),
+    ('reused@example.com', 'Reused Phone', '+254733000001', 'NID004'),
+    ('nophone@example.com', 'No Phone', '', 'NID005'),
+    ('', 'No Email', '+254733000006', 'NID006'),
+]
+
+
+def write_csv(path):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['email', 'full_name', 'password_hash', 'phone_number', 'national_id', 'is_verified', 'category'])
+        for email, full_name, phone, national_id in ROWS:
+            writer.writerow([email, full_name, 'pbkdf2:sha256:1$salt$hash', phone, national_id, 'yes', 'Imported'])
+
+
+def test_import_skips_duplicates_and_conflicts(app, candidates, tmp_path):
+    path = tmp_path / 'candidates.csv'
+    write_csv(path)
+    runner = app.test_cli_runner()
+
+    result = runner.invoke(args=['import-candidates', str(path), '--chunk-size', '2'])
+    assert result.exit_code == 0, result.output
+    assert result.output.startswith('Imported 3 candidates and 1 verifications')
+
+    with app.app_context():
+        names = dict(backend.db.session.execute(
+            backend.db.select(backend.Candidate.email, backend.Candidate.full_name)
+        ).all())
+        assert names['new@example.com'] == 'First Row'
+        assert names['candidate0@example.com'] == 'Candidate 0'
+        assert {'reused@example.com', 'nophone@example.com'} <= set(names)
+
+        verifications = backend.db.session.execute(
+            backend.db.select(backend.Candidate.email, backend.Verification.phone_number, backend.Verification.is_verified)
+            .join(backend.Verification, backend.Verification.candidate_id == backend.Candidate.id)
+            .where(backend.Verification.category == 'Imported')
+        ).all()
+        assert verifications == [('new@example.com', '+254733000001', True)]
+
+    # Running it again changes nothing.
+    result = runner.invoke(args=['import-candidates', str(path)])
+    assert result.output.startswith('Imported 0 candidates and 0 verifications')
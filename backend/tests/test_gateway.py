@@ -0,0 +1,23 @@
+import pytest
+
+
+def batch(candidate_id):
+    return {'votes': [{'voter_phone': '+254711000001', 'candidate_id': candidate_id, 'category': 'Test Category'}]}
+
+
+def test_batch_needs_a_gateway_key(client, candidates):
+    assert client.post('/vote/batch', json=batch(candidates[0])).status_code == 401
+
+    response = client.post('/vote/batch', json=batch(candidates[0]), headers={'X-Gateway-Key': 'test-gateway-key'})
+    assert response.status_code == 200
+    assert response.get_json()['accepted'] == 1
+
+
+@pytest.mark.parametrize('key', ['wrong-key', 'clé-non-ascii', 'ÿ' * 16])
+def test_bad_gateway_key_is_refused_not_an_error(client, candidates, key):
+    headers = {'X-Gateway-Key': key}
+    assert client.post('/vote/batch', json=batch(candidates[0]), headers=headers).status_code == 401
+
+    # /vote treats it as an ordinary voter rather than failing.
+    vote = {'voter_phone': '+254711000002', 'candidate_id': candidates[0], 'category': 'Test Category'}
+    assert client.post('/vote', json=vote, headers=headers).status_code == 200
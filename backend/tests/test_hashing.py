@@ -0,0 +1,38 @@
+import os
+import subprocess
+import sys
+
+from hashing import PasswordHasher
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_script_without_a_main_guard_still_hashes(tmp_path):
+    script = tmp_path / 'hash_once.py'
+    script.write_text(
+        'import sys\n'
+        f'sys.path.insert(0, {BACKEND_DIR!r})\n'
+        'from hashing import PasswordHasher\n'
+        "hasher = PasswordHasher(method='pbkdf2:sha256:1000', workers=1)\n"
+        "print(hasher.check(hasher.hash('secret'), 'secret'))\n"
+    )
+    result = subprocess.run([sys.executable, str(script)], capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == 'True'
+    assert 'hashing in process from now on' in result.stderr
+
+
+def test_killed_pool_falls_back_to_hashing_in_process(caplog):
+    hasher = PasswordHasher(method='pbkdf2:sha256:1000', workers=1)
+    try:
+        pwhash = hasher.hash('secret')
+        for process in list(hasher._executor._processes.values()):
+            process.kill()
+            process.join()
+
+        assert hasher.check(pwhash, 'secret')
+        assert 'hashing in process from now on' in caplog.text
+        assert hasher.check(hasher.hash('other'), 'other')
+    finally:
+        hasher.shutdown()
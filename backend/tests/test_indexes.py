@@ -0,0 +1,38 @@
+import datetime
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+import app as backend
+from explain_check import QUERIES, explain
+
+
+@pytest.mark.parametrize('name', sorted(QUERIES))
+def test_hot_path_lookup_searches_an_index(app, name):
+    sql, params, columns = QUERIES[name]
+    with app.app_context(), backend.db.engine.connect() as connection:
+        plan, uses_index = explain(connection, sql, params, columns)
+    assert uses_index, plan
+
+
+def test_second_vote_for_the_same_candidate_is_refused(client, candidates):
+    vote = {'voter_phone': '+254711000001', 'candidate_id': candidates[0], 'category': 'Test Category'}
+    assert client.post('/vote', json=vote).status_code == 200
+    assert client.post('/vote', json=vote).status_code == 403
+
+
+def test_database_refuses_a_duplicate_vote(app, candidates):
+    # Past the filter and the lookup, the unique constraint still holds.
+    with app.app_context():
+        for _ in range(2):
+            backend.db.session.add(backend.Votes(
+                election=backend.ELECTION_ID,
+                candidate_id=candidates[0],
+                voter_phone='+254711000002',
+                category='Test Category',
+                channel='web',
+                created_at=datetime.datetime.utcnow()
+            ))
+        with pytest.raises(IntegrityError):
+            backend.db.session.commit()
+        backend.db.session.rollback()
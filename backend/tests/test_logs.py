@@ -0,0 +1,49 @@
+import json
+import logging
+
+from logs import JsonFormatter
+from otp import LocalOtpProvider, OtpDispatcher
+
+
+PHONE = '+254712345678'
+
+
+class FailingProvider:
+    def send(self, phone_number):
+        raise RuntimeError(f'The To number {phone_number} is not a valid phone number')
+
+
+def formatted(caplog):
+    formatter = JsonFormatter()
+    lines = []
+    for record in caplog.records:
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        lines.append(formatter.format(record))
+    return lines
+
+
+def test_phone_numbers_in_message_text_are_masked():
+    record = logging.LogRecord('test', logging.INFO, __file__, 1, 'Texting %s and 0712345678', (PHONE,), None)
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry['message'] == 'Texting ***678 and ***678'
+
+
+def test_short_numbers_are_left_alone():
+    record = logging.LogRecord('test', logging.INFO, __file__, 1, 'Candidate 12345 has 42 votes', (), None)
+    assert json.loads(JsonFormatter().format(record))['message'] == 'Candidate 12345 has 42 votes'
+
+
+def test_otp_logs_never_carry_the_phone_number(app, caplog):
+    caplog.set_level(logging.INFO)
+    LocalOtpProvider(fixed_code='123456').send(PHONE)
+
+    dispatcher = OtpDispatcher(FailingProvider(), lambda request_id, status, error: None, app=app)
+    dispatcher._send(7, PHONE)
+
+    lines = formatted(caplog)
+    assert len(lines) == 2
+    for line in lines:
+        assert PHONE not in line
+        assert PHONE[1:] not in line
+    assert json.loads(lines[0])['phone_number'] == '***678'
@@ -0,0 +1,141 @@
+import datetime
+import socket
+import socketserver
+import threading
+
+import pytest
+
+import app as backend
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    # Just enough SMTP for smtplib: accepts everything except recipients in
+    # server.refused, and keeps each delivered message.
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        self.reply('220 stand-in ready')
+        recipients = []
+        while True:
+            line = self.rfile.readline().decode().strip()
+            command = line[:4].upper()
+            if not line or command == 'QUIT':
+                self.reply('221 bye')
+                return
+            if command in ('EHLO', 'HELO'):
+                self.reply('250 stand-in')
+            elif command == 'MAIL':
+                recipients = []
+                self.reply('250 ok')
+            elif command == 'RCPT':
+                recipient = line.split(':', 1)[1].strip().strip('<>')
+                if recipient in self.server.refused:
+                    self.reply('550 no such user')
+                else:
+                    recipients.append(recipient)
+                    self.reply('250 ok')
+            elif command == 'DATA':
+                self.reply('354 go ahead')
+                data = []
+                while (chunk := self.rfile.readline()) != b'.\r\n':
+                    data.append(chunk)
+                self.server.delivered.append((recipients, b''.join(data).decode()))
+                self.reply('250 queued')
+            else:
+                self.reply('250 ok')
+
+
+@pytest.fixture
+def smtp(app, monkeypatch):
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), SMTPHandler)
+    server.daemon_threads = True
+    server.delivered = []
+    server.refused = set()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    state = app.extensions['mail']
+    monkeypatch.setattr(state, 'suppress', False)
+    monkeypatch.setattr(state, 'server', '127.0.0.1')
+    monkeypatch.setattr(state, 'port', server.server_address[1])
+    monkeypatch.setattr(state, 'use_tls', False)
+    monkeypatch.setattr(state, 'use_ssl', False)
+    monkeypatch.setattr(state, 'username', None)
+    monkeypatch.setattr(state, 'default_sender', 'noreply@example.com')
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def queue_mail(recipient):
+    backend.mail_queue.enqueue(recipient, 'Password reset', 'Your token is 123')
+    backend.db.session.commit()
+
+
+def mail_row():
+    backend.db.session.expire_all()
+    return backend.db.session.execute(backend.db.select(backend.OutboundMail)).scalar_one()
+
+
+def make_due(row):
+    row.next_attempt_at = datetime.datetime.utcnow()
+    backend.db.session.commit()
+
+
+def test_queued_mail_is_delivered(app, smtp):
+    with app.app_context():
+        queue_mail('voter@example.com')
+        assert backend.mail_queue.deliver_due() == 1
+
+        row = mail_row()
+        assert (row.status, row.attempts, row.last_error) == ('sent', 1, None)
+        assert row.sent_at is not None
+        assert smtp.delivered[0][0] == ['voter@example.com']
+        assert 'Subject: Password reset' in smtp.delivered[0][1]
+
+
+def test_refused_mail_backs_off_then_fails(app, smtp, monkeypatch):
+    monkeypatch.setattr(backend.mail_queue, 'backoff_seconds', 30)
+    monkeypatch.setattr(backend.mail_queue, 'max_attempts', 3)
+    smtp.refused.add('nobody@example.com')
+
+    with app.app_context():
+        queue_mail('nobody@example.com')
+
+        for attempts, delay in ((1, 30), (2, 60)):
+            before = datetime.datetime.utcnow()
+            assert backend.mail_queue.deliver_due() == 1
+            row = mail_row()
+            assert (row.status, row.attempts) == ('queued', attempts)
+            assert 'no such user' in row.last_error
+            waited = (row.next_attempt_at - before).total_seconds()
+            assert delay - 1 < waited < delay + 1
+
+            # Not due again until the backoff has passed.
+            assert backend.mail_queue.deliver_due() == 0
+            make_due(row)
+
+        assert backend.mail_queue.deliver_due() == 1
+        row = mail_row()
+        assert (row.status, row.attempts, row.sent_at) == ('failed', 3, None)
+        assert smtp.delivered == []
+
+
+def test_unreachable_server_is_retried(app, smtp, monkeypatch):
+    # A port nothing listens on.
+    with socket.socket() as closed:
+        closed.bind(('127.0.0.1', 0))
+        port = closed.getsockname()[1]
+    monkeypatch.setattr(app.extensions['mail'], 'port', port)
+
+    with app.app_context():
+        queue_mail('voter@example.com')
+        assert backend.mail_queue.deliver_due() == 1
+        row = mail_row()
+        assert (row.status, row.attempts) == ('queued', 1)
+
+        monkeypatch.setattr(app.extensions['mail'], 'port', smtp.server_address[1])
+        make_due(row)
+        assert backend.mail_queue.deliver_due() == 1
+        assert mail_row().status == 'sent'
@@ -0,0 +1,25 @@
+import pytest
+
+from query_budget import QueryBudgetExceeded
+
+
+def test_listing_stays_within_its_budget(client, candidates):
+    response = client.get('/get_verifications')
+    assert response.status_code == 200
+    assert len(response.get_json()['verifications']) == len(candidates)
+
+
+def test_going_over_the_budget_raises(app, client, candidates, monkeypatch):
+    monkeypatch.setattr(app.view_functions['api.get_all_verifications'], 'query_budget', 0)
+    with pytest.raises(QueryBudgetExceeded):
+        client.get('/get_verifications')
+
+
+def test_streamed_body_counts_against_the_budget(app, client, candidates, monkeypatch):
+    # The view itself runs no queries; they all happen while the body streams.
+    response = client.get('/get_verifications?stream=1')
+    assert len(response.get_json()['verifications']) == len(candidates)
+
+    monkeypatch.setattr(app.view_functions['api.get_all_verifications'], 'query_budget', 0)
+    with pytest.raises(QueryBudgetExceeded):
+        client.get('/get_verifications?stream=1').get_data()
@@ -0,0 +1,33 @@
+import pytest
+from flask import Flask
+
+from replicas import PIN_COOKIE, init_replica_routing
+
+
+def pin_app(secure):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_BINDS'] = {'replica': 'sqlite://'}
+    app.config['REPLICA_PIN_COOKIE_SECURE'] = secure
+    app.add_url_rule('/write', 'write', lambda: 'ok', methods=['POST'])
+    init_replica_routing(app, db=None, pin_seconds=5)
+    return app
+
+
+def pin_cookie(app, base_url='http://localhost'):
+    response = app.test_client().post('/write', base_url=base_url)
+    header, = [value for value in response.headers.getlist('Set-Cookie') if value.startswith(PIN_COOKIE + '=')]
+    return header
+
+
+@pytest.mark.parametrize('secure, base_url', [(True, 'http://localhost'), (False, 'https://localhost')])
+def test_secure_pin_cookie_can_go_cross_site(secure, base_url):
+    header = pin_cookie(pin_app(secure), base_url)
+    assert '; Secure' in header
+    assert 'SameSite=None' in header
+    assert 'HttpOnly' in header
+
+
+def test_plain_http_pin_cookie_is_same_site_only():
+    header = pin_cookie(pin_app(False))
+    assert '; Secure' not in header
+    assert 'SameSite=Lax' in header
@@ -0,0 +1,61 @@
+import threading
+import time
+
+import app as backend
+from test_tallies import add_vote
+
+
+def refreshers():
+    return [thread for thread in threading.enumerate() if thread.name == 'tally-stream-refresh']
+
+
+def wait_for(condition, seconds=5):
+    deadline = time.monotonic() + seconds
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.02)
+
+
+def test_stream_sends_a_snapshot_and_gives_its_slot_back(client, candidates, monkeypatch):
+    monkeypatch.setattr(backend.tally_stream, 'max_seconds', 0)
+    response = client.get('/results/stream?category=Test%20Category')
+    body = response.get_data(as_text=True)
+    response.close()
+    assert body.startswith('event: snapshot\n')
+    assert backend.tally_stream.open_streams() == 0
+
+
+def test_streams_past_the_cap_are_refused(client, candidates, monkeypatch):
+    monkeypatch.setattr(backend.tally_stream, 'max_clients', 0)
+    response = client.get('/results/stream')
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '5'
+
+
+def test_open_streams_share_one_refresh(app, candidates, monkeypatch):
+    monkeypatch.setattr(backend.tally_stream, 'refresh_seconds', 0.05)
+    rebuilds = []
+    rebuild = backend.leaderboard.rebuild
+    monkeypatch.setattr(backend.leaderboard, 'rebuild', lambda: rebuilds.append(time.monotonic()) or rebuild())
+
+    wait_for(lambda: not refreshers())
+    for _ in range(5):
+        assert backend.tally_stream.acquire()
+    try:
+        assert len(refreshers()) == 1
+
+        # A vote another worker took, seen only through the database.
+        with app.app_context():
+            add_vote(1, candidates[0], '+254711000001')
+        wait_for(lambda: backend.leaderboard.snapshot('Test Category')['Test Category'].get(candidates[0]) == 1)
+
+        # One rebuild per refresh for the worker, not one per stream.
+        started = time.monotonic()
+        time.sleep(0.5)
+        assert len([at for at in rebuilds if at > started]) <= 0.5 / 0.05 + 1
+    finally:
+        for _ in range(5):
+            backend.tally_stream.release()
+
+    # Nothing left to refresh for.
+    wait_for(lambda: not refreshers())
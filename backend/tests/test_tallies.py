@@ -0,0 +1,83 @@
+import datetime
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import app as backend
+
+
+def add_vote(vote_id, candidate_id, phone):
+    backend.db.session.add(backend.Votes(
+        id=vote_id,
+        election=backend.ELECTION_ID,
+        candidate_id=candidate_id,
+        voter_phone=phone,
+        category='Test Category',
+        channel='web',
+        created_at=datetime.datetime.utcnow()
+    ))
+    backend.db.session.commit()
+
+
+def pending_ids():
+    row = backend.db.session.get(backend.TallyProgress, 1)
+    return sorted(int(vote_id) for vote_id in json.loads(row.pending_vote_ids))
+
+
+def test_vote_filling_a_gap_counts_before_it_is_folded_in(app, candidates):
+    key = (candidates[0], 'Test Category')
+    with app.app_context():
+        add_vote(1, candidates[0], '+254711000001')
+        add_vote(3, candidates[0], '+254711000003')
+        backend.tally_keeper.catch_up()
+        assert pending_ids() == [2]
+
+        # Id 2 commits late: counted now, folded in on the next poll.
+        add_vote(2, candidates[0], '+254711000002')
+        assert backend.tally_keeper.live_counts([key]) == {key: 3}
+        backend.tally_keeper.catch_up()
+        assert pending_ids() == []
+        assert backend.tally_keeper.live_counts([key]) == {key: 3}
+
+
+def test_pending_ids_are_kept_within_the_window(app, candidates, monkeypatch):
+    monkeypatch.setattr(backend.tally_keeper, 'pending_window', 10)
+    with app.app_context():
+        add_vote(1, candidates[0], '+254711000001')
+        add_vote(1000, candidates[0], '+254711001000')
+        backend.tally_keeper.catch_up()
+        assert pending_ids() == list(range(991, 1000))
+
+
+def test_reads_agree_with_what_vote_reported(client, candidates):
+    # Straight after the vote, before the tally keeper has folded it in.
+    vote = {'voter_phone': '+254711000009', 'candidate_id': candidates[0], 'category': 'Test Category'}
+    reported = client.post('/vote', json=vote).get_json()['vote_count']
+    assert reported == 1
+
+    assert client.get(f'/get_vote_count/{candidates[0]}').get_json()['vote_count'] == reported
+
+    for path in ('/get_verifications', '/get_verifications?stream=1'):
+        verifications = client.get(path).get_json()['verifications']
+        assert {v['candidate_id']: v['vote_count'] for v in verifications} == {candidates[0]: reported, candidates[1]: 0}
+
+    verification_id = next(v['id'] for v in verifications if v['candidate_id'] == candidates[0])
+    assert client.get(f'/get_single_verification/{verification_id}').get_json()['vote_count'] == reported
+
+
+def test_parallel_votes_are_each_counted_once(app, candidates):
+    def cast(i):
+        response = app.test_client().post('/vote', json={
+            'voter_phone': f'+2547200{i:05d}', 'candidate_id': candidates[i % 2], 'category': 'Test Category'
+        })
+        return candidates[i % 2], response.status_code
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(cast, range(200)))
+    assert all(status == 200 for _, status in results)
+
+    with app.app_context():
+        backend.tally_keeper.catch_up()
+        assert backend.tally_keeper.reconcile() == []
+        for candidate_id in candidates:
+            accepted = sum(1 for c, _ in results if c == candidate_id)
+            assert backend.read_vote_count(candidate_id, 'Test Category') == accepted
@@ -0,0 +1,46 @@
+import threading
+
+import pytest
+
+from vote_filter import VoteFilter
+
+
+def test_callers_do_not_wait_for_the_first_load():
+    loading = threading.Event()
+    release = threading.Event()
+
+    def load():
+        loading.set()
+        release.wait(5)
+        return [('+254700000001', 1)]
+
+    votes = VoteFilter(load, capacity=100)
+    first = threading.Thread(target=votes.might_have_voted, args=('+254700000009', 9))
+    first.start()
+    assert loading.wait(5)
+
+    # Mid-load: "maybe" (go to the database) rather than block.
+    assert votes.might_have_voted('+254700000002', 2)
+    votes.add('+254700000002', 2)
+
+    release.set()
+    first.join(5)
+    assert votes.might_have_voted('+254700000001', 1)
+    assert votes.might_have_voted('+254700000002', 2)
+    assert not votes.might_have_voted('+254700000003', 3)
+
+
+def test_a_failed_load_is_retried():
+    attempts = []
+
+    def load():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError('database unavailable')
+        return []
+
+    votes = VoteFilter(load, capacity=100)
+    with pytest.raises(RuntimeError):
+        votes.might_have_voted('+254700000001', 1)
+    assert not votes.might_have_voted('+254700000001', 1)
+    assert len(attempts) == 2
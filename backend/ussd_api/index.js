@@ -14,6 +14,9 @@ const africasTalking = AfricasTalking({
 });
 
 const BACKEND_URL = process.env.BACKEND_URL || "http://localhost:5000";
+// One of the backend's GATEWAY_API_KEYS. Every vote from here shares this
+// server's address, so the backend limits them per phone instead of per IP.
+const GATEWAY_API_KEY = process.env.GATEWAY_API_KEY;
 
 const categories = [
   "Best Overall Kalenjin Artiste- Secular",
@@ -170,6 +173,10 @@ app.post("/api/ussd", async (req, res) => {
           const voteResponse = await axios.post(`${BACKEND_URL}/vote`, {
             voter_phone: normalizedPhone,
             candidate_id: candidateId,
+            category: session.category,
+            channel: "ussd",
+          }, {
+            headers: GATEWAY_API_KEY ? { "X-Gateway-Key": GATEWAY_API_KEY } : {},
           });
           if (voteResponse.status === 200) {
             response = "END Vote recorded successfully!";
@@ -0,0 +1,127 @@
+import hashlib
+import math
+import threading
+
+
+class BloomFilter:
+    # Fixed-size Bloom filter over strings: sized for `capacity` entries at
+    # `error_rate` false positives, and never a false negative.
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def _positions(self, item):
+        # Double hashing: k positions from the two halves of one digest.
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+
+class ScalableBloomFilter:
+    # A chain of BloomFilters. The first gets half the error budget; when the
+    # newest is full, a new one with twice the capacity and half the error
+    # rate is added, so the combined false positive rate stays under
+    # `error_rate` however many entries arrive.
+
+    def __init__(self, capacity=1_000_000, error_rate=0.001):
+        self.filters = [BloomFilter(capacity, error_rate / 2)]
+
+    def add(self, item):
+        current = self.filters[-1]
+        if current.count >= current.capacity:
+            current = BloomFilter(current.capacity * 2, current.error_rate / 2)
+            self.filters.append(current)
+        current.add(item)
+
+    def __contains__(self, item):
+        return any(item in bloom for bloom in self.filters)
+
+    def __len__(self):
+        return sum(bloom.count for bloom in self.filters)
+
+    @property
+    def nbytes(self):
+        return sum(len(bloom.bits) for bloom in self.filters)
+
+
+class VoteFilter:
+    # Which (voter_phone, candidate_id) pairs this worker knows have voted.
+    # "No" is definite, so a new voter skips the duplicate check; "maybe"
+    # means ask the database. Filled from `load()` on first use (gunicorn
+    # warms it in the master, see gunicorn.conf.py) and from every vote this
+    # worker commits. Votes committed by other workers since then aren't in
+    # it, which only means the unique constraint catches those.
+    #
+    # The first caller loads it without holding the lock; until it's swapped
+    # in, everyone else gets "maybe", and votes committed meanwhile are kept
+    # aside and added to it then.
+
+    def __init__(self, load, capacity=1_000_000, error_rate=0.001):
+        self.load = load
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._lock = threading.Lock()
+        self._filter = None
+        # Keys added while a load is running, or None when none is.
+        self._added_while_loading = None
+
+    def ensure_loaded(self):
+        # Returns the filter, or None while another thread is loading it.
+        if self._filter is not None:
+            return self._filter
+
+        with self._lock:
+            if self._filter is not None or self._added_while_loading is not None:
+                return self._filter
+            self._added_while_loading = []
+
+        try:
+            bloom = ScalableBloomFilter(self.capacity, self.error_rate)
+            for voter_phone, candidate_id in self.load():
+                bloom.add(self._key(voter_phone, candidate_id))
+        except Exception:
+            with self._lock:
+                self._added_while_loading = None
+            raise
+
+        with self._lock:
+            for key in self._added_while_loading:
+                bloom.add(key)
+            self._added_while_loading = None
+            self._filter = bloom
+        return bloom
+
+    def reset(self):
+        # After votes are deleted behind its back; it's reloaded on next use.
+        with self._lock:
+            self._filter = None
+
+    def might_have_voted(self, voter_phone, candidate_id):
+        bloom = self.ensure_loaded()
+        return bloom is None or self._key(voter_phone, candidate_id) in bloom
+
+    def add(self, voter_phone, candidate_id):
+        # Not loaded and not loading: the next load reads this vote anyway.
+        key = self._key(voter_phone, candidate_id)
+        with self._lock:
+            if self._filter is not None:
+                self._filter.add(key)
+            elif self._added_while_loading is not None:
+                self._added_while_loading.append(key)
+
+    def _key(self, voter_phone, candidate_id):
+        return f'{candidate_id}:{voter_phone}'
@@ -0,0 +1,118 @@
+import csv
+import gzip
+import io
+import os
+import re
+
+from sqlalchemy import delete, func, select, text
+
+from bulk import export_query
+
+
+# Election ids double as Postgres partition names (votes_<election>).
+ELECTION_PATTERN = re.compile(r'^[a-z0-9_]{1,40}$')
+
+ARCHIVE_COLUMNS = ['id', 'election', 'candidate_id', 'category', 'voter_phone', 'channel', 'created_at']
+
+
+def check_election(election):
+    if not ELECTION_PATTERN.match(election or ''):
+        raise ValueError(f'Election ids are 1-40 lowercase letters, digits or underscores, not {election!r}')
+    return election
+
+
+def partition_name(election):
+    return f'votes_{check_election(election)}'
+
+
+def is_partitioned(db):
+    # True on Postgres, where the migration makes votes a table partitioned by election.
+    if db.session.get_bind().dialect.name != 'postgresql':
+        return False
+    return db.session.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'votes'::regclass)"
+    )).scalar()
+
+
+def open_election(db, election):
+    # Gives the election its own partition, so its votes are scanned on their
+    # own and archiving it is a DETACH and DROP. Without one they land in
+    # votes_default. Returns False where there's nothing to partition.
+    check_election(election)
+    if not is_partitioned(db):
+        return False
+
+    db.session.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {partition_name(election)} PARTITION OF votes FOR VALUES IN ('{election}')"
+    ))
+    db.session.commit()
+    return True
+
+
+def archive_election(db, vote_model, election, directory, chunk_size=10000):
+    # Writes the election's votes to a gzipped CSV in `directory`, reads the
+    # file back to check every vote is in it, and only then removes them from
+    # the database. The file is named after the ids it holds, so a rerun
+    # never overwrites an earlier archive. Returns (path, votes archived).
+    Vote = vote_model
+    check_election(election)
+    first_id, last_id, expected = db.session.execute(
+        select(func.min(Vote.id), func.max(Vote.id), func.count()).select_from(Vote).where(Vote.election == election)
+    ).one()
+    if not expected:
+        return None, 0
+
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'votes-{election}-{first_id}-{last_id}.csv.gz')
+    partial = path + '.partial'
+
+    query = (
+        select(Vote.id, Vote.election, Vote.candidate_id, Vote.category, Vote.voter_phone, Vote.channel, Vote.created_at)
+        .where(Vote.election == election, Vote.id <= last_id)
+        .order_by(Vote.id)
+    )
+    with open(partial, 'wb') as raw:
+        with gzip.GzipFile(fileobj=raw, mode='wb') as compressed, io.TextIOWrapper(compressed, newline='') as out:
+            export_query(db, query, out, ARCHIVE_COLUMNS)
+        raw.flush()
+        os.fsync(raw.fileno())
+
+    with gzip.open(partial, 'rt', newline='') as f:
+        written = sum(1 for _ in csv.reader(f)) - 1
+    if written != expected:
+        raise RuntimeError(f'{partial} holds {written} votes, expected {expected}; nothing was removed')
+    os.replace(partial, path)
+
+    if is_partitioned(db) and _has_partition(db, election):
+        _drop_partition(db, election, expected)
+    else:
+        # Unpartitioned (SQLite), or the votes are in votes_default.
+        while db.session.execute(
+            delete(Vote)
+            .where(Vote.id.in_(select(Vote.id).where(Vote.election == election, Vote.id <= last_id).limit(chunk_size)))
+            .execution_options(synchronize_session=False)
+        ).rowcount:
+            db.session.commit()
+        db.session.commit()
+
+    return path, expected
+
+
+def _has_partition(db, election):
+    return db.session.execute(
+        text('SELECT to_regclass(:name) IS NOT NULL'), {'name': partition_name(election)}
+    ).scalar()
+
+
+def _drop_partition(db, election, expected):
+    name = partition_name(election)
+    # Nothing may be written to it between the count and the drop.
+    db.session.execute(text(f'LOCK TABLE {name} IN ACCESS EXCLUSIVE MODE'))
+    count = db.session.execute(text(f'SELECT count(*) FROM {name}')).scalar()
+    if count != expected:
+        db.session.rollback()
+        raise RuntimeError(f'{name} gained votes while it was archived ({count}, expected {expected}); nothing was removed')
+
+    db.session.execute(text(f'ALTER TABLE votes DETACH PARTITION {name}'))
+    db.session.execute(text(f'DROP TABLE {name}'))
+    db.session.commit()